@@ -3,23 +3,25 @@
 Отвечает за инициализацию бота, регистрацию обработчиков и запуск бота.
 """
 
+import asyncio
 import logging
 import sys
 import os
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ConversationHandler
-from dotenv import load_dotenv
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder
+from env import ensure_env
 
 # Импортируем модуль базы данных и конфигурацию
 import database
-from config import Config
+from config import Config, get_config
 
 # Импортируем обработчики команд
-from handlers import start_command, process_feedback, send_feedback_request, feedback_handler
+from handlers import start_command, feedback_handler
 
 # Настройка логирования
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO if not Config.DEBUG else logging.DEBUG,
+    level=logging.INFO if not get_config().DEBUG else logging.DEBUG,
     handlers=[
         logging.StreamHandler(sys.stdout),
         logging.FileHandler("logs/bot.log", encoding='utf-8')
@@ -28,6 +30,38 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+class ChatOrderedApplication(Application):
+    """
+    Application, который обрабатывает обновления разных чатов параллельно,
+    а обновления одного чата - строго по очереди.
+    
+    Без этого при concurrent_updates два быстрых сообщения одного пользователя
+    (например, двойное нажатие кнопки группы) проходят ConversationHandler
+    в одном и том же состоянии и регистрируют пользователя дважды.
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # ID чата -> [блокировка, число обновлений чата в обработке или в ожидании]
+        self._chat_locks = {}
+    
+    async def process_update(self, update: object) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await super().process_update(update)
+            return
+        
+        entry = self._chat_locks.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update)
+        finally:
+            # Блокировка удаляется, когда у чата не осталось обновлений
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[chat.id]
+
 # Инициализация базы данных
 def setup_database():
     """Инициализирует базу данных и проверяет подключение"""
@@ -38,41 +72,29 @@ def setup_database():
             logger.error("Ошибка при инициализации базы данных")
             return False
         
-        # Проверка подключения к БД через безопасный вызов
-        try:
-            if not database.check_database_connection():
-                logger.error("Не удалось подключиться к базе данных")
-                return False
-        except AttributeError:
-            # Если функция check_database_connection отсутствует
-            logger.warning("Функция check_database_connection не найдена в модуле database")
-            # Выполняем проверку подключения прямо здесь
-            try:
-                session = database.SessionLocal()
-                result = session.execute(database.text("SELECT 1")).scalar()
-                session.close()
-                logger.info("✅ Соединение с базой данных установлено успешно")
-            except Exception as e:
-                logger.error(f"❌ Ошибка при проверке соединения с базой данных: {e}")
-                return False
+        # Проверка подключения к БД
+        if not database.check_database_connection():
+            logger.error("Не удалось подключиться к базе данных")
+            return False
         
         logger.info("База данных успешно инициализирована")
         return True
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при настройке базы данных: {e}", exc_info=True)
+        logger.error("Неожиданная ошибка при настройке базы данных: %s", e, exc_info=True)
         return False
 
 def main():
     """Основная функция запуска бота"""
     try:
         # Загружаем переменные окружения
-        load_dotenv()
+        ensure_env()
+        config = get_config()
         
         # Проверяем настройки
-        logger.info(f"Токен бота задан: {'Да' if Config.TELEGRAM_TOKEN else 'Нет'}")
-        logger.info(f"ID администратора задан: {'Да' if Config.ADMIN_CHAT_ID else 'Нет'}")
-        logger.info(f"URL базы данных: {Config.DATABASE_URL.split('://')[0]}")
-        logger.info(f"Режим отладки: {'Включен' if Config.DEBUG else 'Выключен'}")
+        logger.info("Токен бота задан: %s", 'Да' if config.TELEGRAM_TOKEN else 'Нет')
+        logger.info("ID администратора задан: %s", 'Да' if config.ADMIN_CHAT_ID else 'Нет')
+        logger.info("URL базы данных: %s", config.DATABASE_URL.split('://')[0])
+        logger.info("Режим отладки: %s", 'Включен' if config.DEBUG else 'Выключен')
         
         # Создаем директорию для логов, если она отсутствует
         os.makedirs('logs', exist_ok=True)
@@ -83,30 +105,60 @@ def main():
             return
         
         # Создаем экземпляр бота
-        logger.info("Создание экземпляра бота...")
-        application = ApplicationBuilder().token(Config.TELEGRAM_TOKEN).build()
+        logger.debug("Создание экземпляра бота...")
+        # concurrent_updates: медленный ответ одному чату не задерживает обработку остальных;
+        # ChatOrderedApplication сохраняет порядок обновлений внутри одного чата.
+        # Пул соединений рассчитан на параллельные ответы разным чатам
+        application = (
+            ApplicationBuilder()
+            .application_class(ChatOrderedApplication)
+            .token(config.TELEGRAM_TOKEN)
+            .concurrent_updates(True)
+            .connection_pool_size(256)
+            .connect_timeout(5)
+            .read_timeout(10)
+            .build()
+        )
         
         # Регистрируем обработчики команд
-        logger.info("Регистрация обработчиков команд...")
+        logger.debug("Регистрация обработчиков команд...")
         application.add_handler(start_command)
         
         # Добавляем обработчик для получения обратной связи
         application.add_handler(feedback_handler)
         
         # Настройка списка команд бота
-        logger.info("Настройка команд бота...")
+        logger.debug("Настройка команд бота...")
         application.bot.set_my_commands([
             ("start", "Начать работу с ботом"),
             ("help", "Получить помощь по использованию бота")
         ])
-        logger.info("Команды бота настроены")
+        logger.debug("Команды бота настроены")
+        
+        # Polling используется только для локальной разработки (--dev или USE_WEBHOOK=false)
+        if not config.USE_WEBHOOK or '--dev' in sys.argv:
+            logger.info("Запуск бота в режиме polling...")
+            application.run_polling(allowed_updates=Config.ALLOWED_UPDATES)
+            return
+        
+        if not config.WEBHOOK_URL:
+            logger.error("Не задан WEBHOOK_URL (или RENDER_EXTERNAL_URL). Завершение работы бота.")
+            return
         
-        # Запускаем бота в режиме polling
-        logger.info("Запуск бота в режиме polling...")
-        application.run_polling(allowed_updates=["message", "callback_query"])
+        # Запускаем бота в режиме webhook
+        logger.info("Запуск бота в режиме webhook на порту %s...", config.PORT)
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=config.PORT,
+            url_path=config.WEBHOOK_PATH,
+            webhook_url=config.WEBHOOK_URL,
+            secret_token=config.WEBHOOK_SECRET,
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Config.ALLOWED_UPDATES
+        )
         
     except Exception as e:
-        logger.error(f"Критическая ошибка при запуске бота: {e}", exc_info=True)
+        logger.error("Критическая ошибка при запуске бота: %s", e, exc_info=True)
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -1,63 +1,84 @@
+import json
 import requests
+from requests.adapters import HTTPAdapter
 import sys
 import os
 import time
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from env import ensure_env
+
+# orjson разбирает ответы API заметно быстрее стандартного json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # Загрузка переменных окружения
-load_dotenv()
+ensure_env()
 
-# Получение токена бота
+# Получение токена бота (наличие проверяется в main)
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-if not TELEGRAM_TOKEN:
-    print("Ошибка: TELEGRAM_TOKEN не найден в переменных окружения")
-    sys.exit(1)
 
-def check_webhook():
-    """Проверка статуса вебхука."""
-    webhook_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getWebhookInfo"
+# Базовый URL Bot API для этого токена
+API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+
+# Общая HTTP-сессия: соединение с api.telegram.org (TCP + TLS) переиспользуется
+# между проверками вместо установки нового на каждый запрос
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+
+def check_webhook(pending=None):
+    """Проверка статуса вебхука.
+    
+    pending - уже отправленный запрос getWebhookInfo (Future), если он есть.
+    """
+    webhook_url = f"{API_URL}/getWebhookInfo"
     
     try:
-        response = requests.get(webhook_url)
+        response = pending.result() if pending else http_session.get(webhook_url)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get("ok"):
             webhook_info = data.get("result", {})
             
-            print("=== Информация о вебхуке ===")
-            print(f"URL: {webhook_info.get('url', 'Не установлен')}")
-            print(f"Используется: {'Да' if webhook_info.get('url') else 'Нет'}")
-            print(f"Последняя ошибка: {webhook_info.get('last_error_message', 'Нет ошибок')}")
-            print(f"Последняя ошибка время: {webhook_info.get('last_error_date', 'Нет ошибок')}")
-            print(f"Ожидающие обновления: {webhook_info.get('pending_update_count', 0)}")
-            print(f"Максимальные соединения: {webhook_info.get('max_connections', 'Не указано')}")
+            # Отчет собирается целиком и выводится одной записью
+            out = []
+            out.append("=== Информация о вебхуке ===")
+            out.append(f"URL: {webhook_info.get('url', 'Не установлен')}")
+            out.append(f"Используется: {'Да' if webhook_info.get('url') else 'Нет'}")
+            out.append(f"Последняя ошибка: {webhook_info.get('last_error_message', 'Нет ошибок')}")
+            out.append(f"Последняя ошибка время: {webhook_info.get('last_error_date', 'Нет ошибок')}")
+            out.append(f"Ожидающие обновления: {webhook_info.get('pending_update_count', 0)}")
+            out.append(f"Максимальные соединения: {webhook_info.get('max_connections', 'Не указано')}")
             
             # Проверка наличия ошибок
             if webhook_info.get('last_error_message'):
-                print("\n⚠️ ВНИМАНИЕ: Обнаружена ошибка вебхука!")
-                print(f"Ошибка: {webhook_info.get('last_error_message')}")
+                out.append("\n⚠️ ВНИМАНИЕ: Обнаружена ошибка вебхука!")
+                out.append(f"Ошибка: {webhook_info.get('last_error_message')}")
                 
                 if "wrong response from the webhook" in webhook_info.get('last_error_message', ''):
-                    print("\nВозможные причины:")
-                    print("1. Ваш сервер не отвечает правильно на запросы Telegram")
-                    print("2. URL вебхука неверный или сервер недоступен")
-                    print("3. В обработчике вебхука происходит ошибка")
+                    out.append("\nВозможные причины:")
+                    out.append("1. Ваш сервер не отвечает правильно на запросы Telegram")
+                    out.append("2. URL вебхука неверный или сервер недоступен")
+                    out.append("3. В обработчике вебхука происходит ошибка")
                     
-                print("\nРекомендации:")
-                print("1. Проверьте, что ваш сервер запущен и доступен")
-                print("2. Убедитесь, что URL вебхука правильный")
-                print("3. Проверьте логи на наличие ошибок")
+                out.append("\nРекомендации:")
+                out.append("1. Проверьте, что ваш сервер запущен и доступен")
+                out.append("2. Убедитесь, что URL вебхука правильный")
+                out.append("3. Проверьте логи на наличие ошибок")
             
             # URL не установлен
             if not webhook_info.get('url'):
-                print("\n⚠️ ВНИМАНИЕ: URL вебхука не установлен!")
-                print("Бот работает в режиме опроса (polling) или вебхук не настроен")
-                print("\nРекомендации:")
-                print("1. Установите вебхук с помощью скрипта set_webhook.py")
-                print("2. Или вручную через API: /setWebhook?url=<URL>")
+                out.append("\n⚠️ ВНИМАНИЕ: URL вебхука не установлен!")
+                out.append("Бот работает в режиме опроса (polling) или вебхук не настроен")
+                out.append("\nРекомендации:")
+                out.append("1. Установите вебхук с помощью скрипта set_webhook.py")
+                out.append("2. Или вручную через API: /setWebhook?url=<URL>")
             
+            print("\n".join(out))
             return webhook_info
             
         else:
@@ -68,27 +89,32 @@ def check_webhook():
         print(f"Ошибка при выполнении запроса: {e}")
         return None
 
-def check_bot_info():
-    """Проверка информации о боте."""
-    bot_info_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getMe"
+def check_bot_info(pending=None):
+    """Проверка информации о боте.
+    
+    pending - уже отправленный запрос getMe (Future), если он есть.
+    """
+    bot_info_url = f"{API_URL}/getMe"
     
     try:
-        response = requests.get(bot_info_url)
+        response = pending.result() if pending else http_session.get(bot_info_url)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get("ok"):
             bot_info = data.get("result", {})
             
-            print("\n=== Информация о боте ===")
-            print(f"ID: {bot_info.get('id')}")
-            print(f"Имя: {bot_info.get('first_name')}")
-            print(f"Username: @{bot_info.get('username')}")
-            print(f"Может присоединяться к группам: {'Да' if bot_info.get('can_join_groups') else 'Нет'}")
-            print(f"Может читать все сообщения: {'Да' if bot_info.get('can_read_all_group_messages') else 'Нет'}")
-            print(f"Поддерживает встроенные запросы: {'Да' if bot_info.get('supports_inline_queries') else 'Нет'}")
+            out = []
+            out.append("\n=== Информация о боте ===")
+            out.append(f"ID: {bot_info.get('id')}")
+            out.append(f"Имя: {bot_info.get('first_name')}")
+            out.append(f"Username: @{bot_info.get('username')}")
+            out.append(f"Может присоединяться к группам: {'Да' if bot_info.get('can_join_groups') else 'Нет'}")
+            out.append(f"Может читать все сообщения: {'Да' if bot_info.get('can_read_all_group_messages') else 'Нет'}")
+            out.append(f"Поддерживает встроенные запросы: {'Да' if bot_info.get('supports_inline_queries') else 'Нет'}")
             
+            print("\n".join(out))
             return bot_info
             
         else:
@@ -101,27 +127,35 @@ def check_bot_info():
 
 def check_updates():
     """Проверка последних обновлений."""
-    updates_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getUpdates?limit=5"
+    updates_url = f"{API_URL}/getUpdates"
+    # Только типы, которые обрабатывает бот; timeout=0 - ответ без ожидания
+    params = {
+        "limit": 5,
+        "timeout": 0,
+        "allowed_updates": json.dumps(Config.ALLOWED_UPDATES)
+    }
     
     try:
-        response = requests.get(updates_url)
+        response = http_session.get(updates_url, params=params)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get("ok"):
             updates = data.get("result", [])
             
+            out = []
             if not updates:
-                print("\n=== Последние обновления ===")
-                print("Нет доступных обновлений. Возможные причины:")
-                print("1. Бот работает в режиме вебхука (getUpdates не работает при активном вебхуке)")
-                print("2. Никто не взаимодействовал с ботом")
-                print("3. Все обновления уже обработаны")
+                out.append("\n=== Последние обновления ===")
+                out.append("Нет доступных обновлений. Возможные причины:")
+                out.append("1. Бот работает в режиме вебхука (getUpdates не работает при активном вебхуке)")
+                out.append("2. Никто не взаимодействовал с ботом")
+                out.append("3. Все обновления уже обработаны")
+                print("\n".join(out))
                 return []
             
-            print("\n=== Последние обновления ===")
-            print(f"Найдено {len(updates)} обновлений")
+            out.append("\n=== Последние обновления ===")
+            out.append(f"Найдено {len(updates)} обновлений")
             
             for update in updates:
                 update_id = update.get('update_id')
@@ -133,21 +167,22 @@ def check_updates():
                     chat = message.get('chat', {})
                     text = message.get('text', '<нет текста>')
                     
-                    print(f"\nID обновления: {update_id}")
-                    print(f"Тип: сообщение")
-                    print(f"От: {from_user.get('first_name')} (@{from_user.get('username', 'нет')})")
-                    print(f"Чат ID: {chat.get('id')}")
-                    print(f"Текст: {text}")
+                    out.append(f"\nID обновления: {update_id}")
+                    out.append(f"Тип: сообщение")
+                    out.append(f"От: {from_user.get('first_name')} (@{from_user.get('username', 'нет')})")
+                    out.append(f"Чат ID: {chat.get('id')}")
+                    out.append(f"Текст: {text}")
                 
                 elif callback_query:
                     from_user = callback_query.get('from', {})
                     data = callback_query.get('data', '<нет данных>')
                     
-                    print(f"\nID обновления: {update_id}")
-                    print(f"Тип: callback_query")
-                    print(f"От: {from_user.get('first_name')} (@{from_user.get('username', 'нет')})")
-                    print(f"Данные: {data}")
+                    out.append(f"\nID обновления: {update_id}")
+                    out.append(f"Тип: callback_query")
+                    out.append(f"От: {from_user.get('first_name')} (@{from_user.get('username', 'нет')})")
+                    out.append(f"Данные: {data}")
             
+            print("\n".join(out))
             return updates
             
         else:
@@ -168,17 +203,23 @@ def check_render_service(url):
     print(f"\n=== Проверка доступности сервиса на {ping_url} ===")
     print("Подождите, сервер на Render может требовать время для пробуждения...")
     
-    max_attempts = 3
+    # Паузы между попытками растут: после холодного старта Render
+    # сервис обычно отвечает уже через несколько секунд
+    wait_times = [2, 5, 10]
+    max_attempts = len(wait_times) + 1
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"Попытка {attempt}/{max_attempts}...")
-            response = requests.get(ping_url, timeout=30)  # Увеличенный таймаут
+            # HEAD будит сервис без передачи тела; JSON запрашиваем только у проснувшегося
+            response = http_session.head(ping_url, timeout=30, allow_redirects=False)
+            if response.status_code < 500:
+                response = http_session.get(ping_url, timeout=30)
             
             print(f"Статус-код: {response.status_code}")
             
             if response.status_code == 200:
                 try:
-                    data = response.json()
+                    data = json_loads(response.content)
                     print(f"Статус: {data.get('status')}")
                     print(f"Сообщение: {data.get('message')}")
                     print(f"Время: {data.get('time')}")
@@ -191,18 +232,13 @@ def check_render_service(url):
             else:
                 print(f"Неуспешный ответ: {response.text[:100]}")
             
-            if attempt < max_attempts:
-                wait_time = 10  # секунд
-                print(f"Ожидание {wait_time} секунд перед следующей попыткой...")
-                time.sleep(wait_time)
-            
         except requests.exceptions.RequestException as e:
             print(f"Ошибка при выполнении запроса: {e}")
-            
-            if attempt < max_attempts:
-                wait_time = 10  # секунд
-                print(f"Ожидание {wait_time} секунд перед следующей попыткой...")
-                time.sleep(wait_time)
+        
+        if attempt < max_attempts:
+            wait_time = wait_times[attempt - 1]
+            print(f"Ожидание {wait_time} секунд перед следующей попыткой...")
+            time.sleep(wait_time)
     
     print("Все попытки исчерпаны. Сервис недоступен.")
     return False
@@ -216,13 +252,13 @@ def remove_webhook():
         print("Операция отменена.")
         return False
     
-    remove_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/deleteWebhook"
+    remove_url = f"{API_URL}/deleteWebhook"
     
     try:
-        response = requests.post(remove_url)
+        response = http_session.post(remove_url)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         if data.get("ok"):
             print("Вебхук успешно удален!")
             return True
@@ -243,17 +279,17 @@ def send_test_message():
         print("ID чата не может быть пустым. Операция отменена.")
         return False
     
-    send_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
+    send_url = f"{API_URL}/sendMessage"
     params = {
         "chat_id": chat_id,
         "text": "Это тестовое сообщение от скрипта проверки бота. Если вы видите это сообщение, значит бот работает правильно."
     }
     
     try:
-        response = requests.post(send_url, json=params)
+        response = http_session.post(send_url, json=params)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         if data.get("ok"):
             print("Тестовое сообщение успешно отправлено!")
             return True
@@ -265,18 +301,51 @@ def send_test_message():
         print(f"Ошибка при выполнении запроса: {e}")
         return False
 
+def prompt_render_service():
+    """Запрашивает URL сервиса и проверяет его доступность."""
+    url = input("\nВведите URL вашего сервиса для проверки (например, https://feedback-bot.onrender.com): ")
+    if url:
+        check_render_service(url)
+
+# Действия меню по номеру пункта
+MENU_ACTIONS = {
+    '1': check_webhook,
+    '2': check_updates,
+    '3': prompt_render_service,
+    '4': remove_webhook,
+    '5': send_test_message,
+}
+
 def main():
-    print("==== Инструмент проверки бота Telegram ====")
+    if not TELEGRAM_TOKEN:
+        print("Ошибка: TELEGRAM_TOKEN не найден в переменных окружения")
+        sys.exit(1)
     
-    # Проверка информации о боте
-    bot_info = check_bot_info()
+    # readline добавляет в input() редактирование строки и историю ввода
+    try:
+        import readline
+    except ImportError:
+        pass
     
-    if not bot_info:
-        print("Не удалось получить информацию о боте. Проверьте токен.")
-        sys.exit(1)
+    print("==== Инструмент проверки бота Telegram ====")
     
-    # Проверка вебхука
-    webhook_info = check_webhook()
+    # Запросы getMe и getWebhookInfo независимы: отправляем их одновременно,
+    # а результаты выводим по порядку
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        bot_info_request = executor.submit(
+            http_session.get, f"{API_URL}/getMe")
+        webhook_request = executor.submit(
+            http_session.get, f"{API_URL}/getWebhookInfo")
+        
+        # Проверка информации о боте
+        bot_info = check_bot_info(bot_info_request)
+        
+        if not bot_info:
+            print("Не удалось получить информацию о боте. Проверьте токен.")
+            sys.exit(1)
+        
+        # Проверка вебхука
+        webhook_info = check_webhook(webhook_request)
     
     # Меню действий
     while True:
@@ -290,21 +359,13 @@ def main():
         
         choice = input("\nВыберите действие (1-6): ")
         
-        if choice == '1':
-            check_webhook()
-        elif choice == '2':
-            check_updates()
-        elif choice == '3':
-            url = input("\nВведите URL вашего сервиса для проверки (например, https://feedback-bot.onrender.com): ")
-            if url:
-                check_render_service(url)
-        elif choice == '4':
-            remove_webhook()
-        elif choice == '5':
-            send_test_message()
-        elif choice == '6':
+        if choice == '6':
             print("\n==== Диагностика завершена ====")
             break
+        
+        action = MENU_ACTIONS.get(choice)
+        if action:
+            action()
         else:
             print("Неверный выбор. Пожалуйста, выберите число от 1 до 6.")
 
@@ -5,51 +5,61 @@
 
 import os
 import logging
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import cache
+from typing import ClassVar, Optional
+from urllib.parse import urlparse
+from env import ensure_env
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
-# Загрузка переменных окружения
-load_dotenv()
 
+@dataclass(frozen=True)
 class Config:
     """Класс конфигурации бота"""
     
     # Токен бота Telegram
-    TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-    if not TELEGRAM_TOKEN:
-        logger.warning("Не задан токен бота Telegram (TELEGRAM_TOKEN)")
+    TELEGRAM_TOKEN: Optional[str]
     
     # ID администратора (для пересылки обратной связи)
-    ADMIN_CHAT_ID = os.getenv('ADMIN_CHAT_ID')
-    if not ADMIN_CHAT_ID:
-        logger.warning("ADMIN_CHAT_ID не указан в переменных окружения. Обратная связь не будет пересылаться администратору.")
+    ADMIN_CHAT_ID: Optional[str]
     
     # URL базы данных
-    DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///feedback_bot.db')
-    
-    # Проверка URL базы данных
-    if DATABASE_URL.startswith('sqlite:///'):
-        # Проверка на существование файла для SQLite
-        db_file = DATABASE_URL.replace('sqlite:///', '')
-        if not os.path.exists(db_file) and db_file != ':memory:':
-            logger.info(f"Файл базы данных SQLite '{db_file}' не существует и будет создан автоматически")
-    elif DATABASE_URL and DATABASE_URL.startswith('postgres://'):
-        DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://')
-        logger.info("URL базы данных преобразован из postgres:// в postgresql://")
+    DATABASE_URL: str
     
     # Режим отладки
-    DEBUG = os.getenv('DEBUG', 'False').lower() in ('true', '1', 't')
+    DEBUG: bool
+    
+    # Режим работы: webhook (по умолчанию) или polling для локальной разработки
+    USE_WEBHOOK: bool
+    
+    # Порт веб-сервера для webhook (на Render задается через PORT)
+    PORT: int
+    
+    # URL вебхука; на Render формируется из RENDER_EXTERNAL_URL
+    WEBHOOK_URL: Optional[str]
+    
+    # Путь, по которому локальный веб-сервер принимает запросы вебхука
+    WEBHOOK_PATH: str
+    
+    # Секрет, который Telegram передает в заголовке каждого запроса вебхука
+    WEBHOOK_SECRET: Optional[str]
     
     # Настройки групп
-    GROUPS = {
+    GROUPS: ClassVar[dict] = {
         'weekday': 'Будни (пн-пт)',
         'weekend': 'Выходные (сб)'
     }
     
+    # Типы обновлений, которые обрабатывает бот (общие для bot.py и скриптов установки вебхука)
+    ALLOWED_UPDATES: ClassVar[list] = ["message", "callback_query"]
+    
+    # Максимальное число одновременных соединений Telegram с вебхуком
+    WEBHOOK_MAX_CONNECTIONS: ClassVar[int] = 100
+    
     # Дни недели
-    WEEKDAYS = {
+    WEEKDAYS: ClassVar[dict] = {
         0: 'Понедельник',
         1: 'Вторник',
         2: 'Среда',
@@ -59,10 +69,70 @@ class Config:
         6: 'Воскресенье'
     }
 
+
+def load_config() -> Config:
+    """
+    Читает настройки из переменных окружения и проверяет их.
+    
+    Returns:
+        Config: Заполненная конфигурация бота
+    """
+    # Загрузка переменных окружения
+    ensure_env()
+    
+    telegram_token = os.getenv('TELEGRAM_TOKEN')
+    if not telegram_token:
+        logger.warning("Не задан токен бота Telegram (TELEGRAM_TOKEN)")
+    
+    admin_chat_id = os.getenv('ADMIN_CHAT_ID')
+    if not admin_chat_id:
+        logger.warning("ADMIN_CHAT_ID не указан в переменных окружения. Обратная связь не будет пересылаться администратору.")
+    
+    database_url = os.getenv('DATABASE_URL', 'sqlite:///feedback_bot.db')
+    
+    # Проверка URL базы данных
+    if database_url.startswith('sqlite:///'):
+        # Проверка на существование файла для SQLite
+        db_file = database_url.replace('sqlite:///', '')
+        if not os.path.exists(db_file) and db_file != ':memory:':
+            logger.info(f"Файл базы данных SQLite '{db_file}' не существует и будет создан автоматически")
+    elif database_url.startswith(('postgres://', 'postgresql://')):
+        # Для PostgreSQL используется драйвер psycopg 3
+        database_url = 'postgresql+psycopg://' + database_url.split('://', 1)[1]
+        logger.info("URL базы данных преобразован в postgresql+psycopg://")
+    
+    webhook_url = os.getenv('WEBHOOK_URL')
+    if not webhook_url and os.getenv('RENDER_EXTERNAL_URL') and telegram_token:
+        webhook_url = f"{os.getenv('RENDER_EXTERNAL_URL').rstrip('/')}/bot{telegram_token}"
+    
+    config = Config(
+        TELEGRAM_TOKEN=telegram_token,
+        ADMIN_CHAT_ID=admin_chat_id,
+        DATABASE_URL=database_url,
+        DEBUG=os.getenv('DEBUG', 'False').lower() in ('true', '1', 't'),
+        USE_WEBHOOK=os.getenv('USE_WEBHOOK', 'True').lower() in ('true', '1', 't'),
+        PORT=int(os.getenv('PORT', '10000')),
+        WEBHOOK_URL=webhook_url,
+        WEBHOOK_PATH=urlparse(webhook_url or '').path.lstrip('/') or f"bot{telegram_token}",
+        WEBHOOK_SECRET=os.getenv('WEBHOOK_SECRET')
+    )
+    
+    logger.info("Конфигурация загружена")
+    logger.debug("База данных: %s", config.DATABASE_URL.split('://')[0])
+    logger.debug("Режим отладки: %s", 'включен' if config.DEBUG else 'выключен')
+    return config
+
+
+@cache
+def get_config() -> Config:
+    """
+    Возвращает конфигурацию бота, загружая ее при первом обращении.
+    
+    Returns:
+        Config: Конфигурация бота
+    """
+    return load_config()
+
+
 # Статус готовности базы данных
 DB_READY = False
-
-logger.info("Конфигурация загружена")
-logger.debug(f"Бот использует токен: {Config.TELEGRAM_TOKEN[:5]}...{Config.TELEGRAM_TOKEN[-5:] if Config.TELEGRAM_TOKEN and len(Config.TELEGRAM_TOKEN) > 10 else '***'}")
-logger.debug(f"База данных: {Config.DATABASE_URL.split('://')[0]}")
-logger.debug(f"Режим отладки: {'включен' if Config.DEBUG else 'выключен'}") 
\ No newline at end of file
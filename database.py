@@ -2,15 +2,22 @@
 Модуль для работы с базой данных.
 Определяет модели данных и функции для инициализации базы.
 """
-import os
+import asyncio
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, text, inspect
+from functools import partial
+from typing import Optional
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Boolean, DateTime, text, inspect, select, exists, bindparam, insert, Index, true
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import traceback
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import StaticPool
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from config import get_config
 
 # Настройка логирования
 logging.basicConfig(
@@ -20,27 +27,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Загрузка переменных окружения
-load_dotenv()
-
-# Получение URL базы данных
-DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///feedback_bot.db')
+# Получение URL базы данных (уже нормализованного конфигурацией)
+DATABASE_URL = get_config().DATABASE_URL
 
 logger.info(f"Используется база данных: {DATABASE_URL.split('://')[0]}")
 
 # Создаем базовый класс для моделей
 Base = declarative_base()
 
+if DATABASE_URL.startswith('sqlite'):
+    # Для файла SQLite достаточно одного соединения на процесс
+    ENGINE_OPTIONS = {
+        'poolclass': StaticPool,
+        'connect_args': {'check_same_thread': False},
+    }
+    # Общее соединение нельзя использовать из нескольких потоков одновременно
+    DB_WORKERS = 1
+else:
+    # Параметры пула соединений: соединения переиспользуются между вызовами,
+    # перед выдачей проверяются и пересоздаются раньше, чем Render закрывает простаивающие (~5 мин)
+    ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+    }
+    # По одному потоку на постоянное соединение пула
+    DB_WORKERS = ENGINE_OPTIONS['pool_size']
+
+# psycopg 3 начинает кэшировать подготовленные запросы на сервере после 5 выполнений
+if DATABASE_URL.startswith('postgresql+psycopg://'):
+    ENGINE_OPTIONS['connect_args'] = {'prepare_threshold': 5}
+
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    Настраивает каждое новое соединение SQLite: журнал WAL и synchronous=NORMAL
+    сокращают число fsync на коммит, временные таблицы держатся в памяти.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
 # Создаем движок SQLAlchemy
 try:
     logger.info(f"Создание движка SQLAlchemy для подключения к БД: {DATABASE_URL.split('://')[0]}")
-    engine = create_engine(DATABASE_URL, echo=False)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine = create_engine(DATABASE_URL, echo=False, **ENGINE_OPTIONS)
+    # Настройки SQLite применяются только к соединениям этого движка
+    if DATABASE_URL.startswith('sqlite'):
+        event.listen(engine, "connect", set_sqlite_pragma)
+    SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, expire_on_commit=False))
     logger.info("Движок SQLAlchemy создан успешно")
 except Exception as e:
     logger.error(f"Критическая ошибка при создании движка SQLAlchemy: {e}")
     # Даже если произошла ошибка, мы определим Session, чтобы избежать ошибок импорта
-    SessionLocal = sessionmaker()
+    engine = None
+    SessionLocal = scoped_session(sessionmaker(autoflush=False, expire_on_commit=False))
+
+# Потоки, в которых обработчики бота выполняют запросы, не блокируя цикл событий
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
 
 # Определение таблиц
 class User(Base):
@@ -48,14 +95,20 @@ class User(Base):
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
-    chat_id = Column(Integer, unique=True, nullable=False)
+    chat_id = Column(BigInteger, unique=True, index=True, nullable=False)
     username = Column(String, nullable=True)
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
     group_type = Column(String, nullable=False)
+    group_day = Column(Integer, nullable=True)
     start_date = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, server_default=true(), nullable=False)
+    
+    __table_args__ = (
+        # Рассылка выбирает активных пользователей по дню занятий
+        Index('ix_users_active_day', 'is_active', 'group_day'),
+    )
     
     def __repr__(self):
         return f"<User(id={self.id}, chat_id={self.chat_id}, username={self.username})>"
@@ -68,7 +121,7 @@ class Feedback(Base):
     __tablename__ = 'feedback'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
     message = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -76,27 +129,71 @@ class Feedback(Base):
         return f"<Feedback(id={self.id}, user_id={self.user_id}, created_at={self.created_at})>"
 
 
+# Запрос проверки существования пользователя строится один раз;
+# скомпилированная форма берется из кэша SQLAlchemy при каждом вызове
+CHECK_USER_EXISTS_STMT = select(exists().where(User.chat_id == bindparam('user_id')))
+
+# Вставка отзыва только для зарегистрированного пользователя:
+# INSERT ... SELECT ... WHERE EXISTS вместо отдельной проверки и вставки
+SAVE_FEEDBACK_STMT = insert(Feedback.__table__).from_select(
+    ['user_id', 'message', 'created_at'],
+    select(
+        bindparam('user_id', type_=BigInteger),
+        bindparam('message', type_=String),
+        bindparam('created_at', type_=DateTime)
+    ).where(exists().where(User.chat_id == bindparam('user_id')))
+)
+
+# INSERT ... ON CONFLICT DO UPDATE для диалектов, которые его поддерживают
+UPSERT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert,
+}
+
+# Выборка только нужных рассылке колонок, без создания ORM-объектов
+# Булева колонка в условии как есть: без "= true", но с использованием индекса
+ACTIVE_USERS_BY_DAY_STMT = select(User.chat_id, User.group_type).where(
+    User.is_active,
+    User.group_day == bindparam('day')
+)
+
+
 def get_engine():
     """
-    Создает и возвращает объект SQLAlchemy Engine.
+    Возвращает общий для всего процесса объект SQLAlchemy Engine.
+    """
+    if engine is None:
+        raise RuntimeError("Движок SQLAlchemy не был создан")
+    return engine
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Выполняет синхронную функцию работы с БД в пуле потоков DB_EXECUTOR.
+    
+    Args:
+        func: Функция модуля database (check_user_exists, save_feedback и т.д.)
+        *args, **kwargs: Аргументы функции
+        
+    Returns:
+        Результат функции
     """
-    logger.info(f"Подключение к базе данных: {DATABASE_URL.split('://')[0]}")
-    return create_engine(DATABASE_URL)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(DB_EXECUTOR, partial(func, *args, **kwargs))
 
 
 def init_db():
     """
-    Инициализирует базу данных: создает таблицы и настраивает сессию.
+    Инициализирует базу данных: создает недостающие таблицы и колонки.
     """
     try:
-        # Создаем движок базы данных
         engine = get_engine()
         
         # Создаем таблицы, если они не существуют
         Base.metadata.create_all(engine)
         
-        # Настраиваем фабрику сессий
-        SessionLocal.configure(bind=engine)
+        # Дополняем таблицы, созданные предыдущими версиями бота
+        migrate_schema(engine)
         
         logger.info("База данных инициализирована успешно")
         return True
@@ -106,6 +203,54 @@ def init_db():
         return False
 
 
+def migrate_schema(engine) -> None:
+    """
+    Приводит таблицы, созданные предыдущими версиями бота, к текущей схеме:
+    добавляет в users колонку group_day с индексом (день вычисляется по группе)
+    и расширяет колонки с ID Telegram до BIGINT в PostgreSQL.
+    """
+    inspector = inspect(engine)
+    user_columns = {column['name']: column for column in inspector.get_columns('users')}
+    
+    if 'group_day' not in user_columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE users ADD COLUMN group_day INTEGER"))
+            connection.execute(text(
+                "UPDATE users SET group_day = CASE group_type WHEN 'weekend' THEN 5 ELSE 0 END"
+            ))
+        for index in User.__table__.indexes:
+            index.create(engine, checkfirst=True)
+        logger.info("В таблицу users добавлена колонка group_day")
+    
+    # В SQLite INTEGER и так хранит 64-битные значения
+    if engine.dialect.name != 'postgresql':
+        return
+    
+    feedback_columns = {column['name']: column for column in inspector.get_columns('feedback')}
+    for table, column in (('users', user_columns['chat_id']), ('feedback', feedback_columns['user_id'])):
+        if not isinstance(column['type'], BigInteger):
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column['name']} TYPE BIGINT"))
+            logger.info("Колонка %s.%s расширена до BIGINT", table, column['name'])
+
+
+@contextmanager
+def session_scope():
+    """
+    Открывает сессию на время блока with.
+    При успешном завершении блока изменения фиксируются, при ошибке откатываются.
+    """
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        SessionLocal.remove()
+
+
 def check_user_exists(user_id: int) -> bool:
     """
     Проверяет, существует ли пользователь с указанным ID в базе данных.
@@ -117,24 +262,17 @@ def check_user_exists(user_id: int) -> bool:
         bool: True, если пользователь существует, иначе False
     """
     try:
-        session = SessionLocal()
-        
-        # Проверяем наличие пользователя
-        result = session.execute(
-            text("SELECT 1 FROM users WHERE chat_id = :user_id"),
-            {"user_id": user_id}
-        ).scalar() is not None
+        with session_scope() as session:
+            # Проверяем наличие пользователя
+            result = bool(session.execute(CHECK_USER_EXISTS_STMT, {"user_id": user_id}).scalar())
 
-        logger.debug(f"Проверка существования пользователя {user_id}: {result}")
+        logger.debug("Проверка существования пользователя %s: %s", user_id, result)
         
         return result
     
     except Exception as e:
         logger.error(f"Ошибка при проверке существования пользователя {user_id}: {e}")
         return False
-    
-    finally:
-        session.close()
 
 
 def create_new_user(user_id: int, username: str, first_name: str, last_name: str, 
@@ -155,8 +293,6 @@ def create_new_user(user_id: int, username: str, first_name: str, last_name: str
         bool: True, если пользователь успешно создан, иначе False
     """
     try:
-        session = SessionLocal()
-        
         # Обработка параметров для избежания ошибок
         if isinstance(start_date, str):
             # Если дата пришла в виде строки, преобразуем её в объект datetime
@@ -179,33 +315,42 @@ def create_new_user(user_id: int, username: str, first_name: str, last_name: str
             last_name = ""
             
         # Детальное логирование параметров
-        logger.info(f"Создание пользователя с параметрами: user_id={user_id}, username={username}, "
-                    f"first_name={first_name}, last_name={last_name}, group={group}, "
-                    f"start_date={start_date}")
+        logger.debug("Создание пользователя с параметрами: user_id=%s, username=%s, "
+                     "first_name=%s, last_name=%s, group=%s, start_date=%s",
+                     user_id, username, first_name, last_name, group, start_date)
         
-        # Создаем нового пользователя
-        new_user = User(
+        values = dict(
             chat_id=user_id,
             username=username,
             first_name=first_name,
             last_name=last_name,
             group_type=group,
-            start_date=start_date
+            group_day=group_day,
+            start_date=start_date,
+            is_active=True
         )
         
-        session.add(new_user)
-        session.commit()
+        with session_scope() as session:
+            upsert_insert = UPSERT_INSERTS.get(engine.dialect.name)
+            if upsert_insert is None:
+                # Диалект без UPSERT: обычная вставка
+                session.add(User(**values))
+            else:
+                # Повторный /start (в том числе параллельный) обновляет запись,
+                # а не падает на уникальном chat_id
+                stmt = upsert_insert(User).values(**values)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[User.chat_id],
+                    set_={key: stmt.excluded[key] for key in values if key != 'chat_id'}
+                )
+                session.execute(stmt)
         
         logger.info(f"Создан новый пользователь: {user_id}, группа: {group}")
         return True
     
     except Exception as e:
         logger.error(f"Ошибка при создании пользователя {user_id}: {e}")
-        session.rollback()
         return False
-    
-    finally:
-        session.close()
 
 
 def update_user_status(user_id: int, is_active: bool) -> bool:
@@ -220,15 +365,12 @@ def update_user_status(user_id: int, is_active: bool) -> bool:
         bool: True, если статус успешно обновлен, иначе False
     """
     try:
-        session = SessionLocal()
-        
-        # Обновляем статус активности
-        result = session.execute(
-            text("UPDATE users SET is_active = :is_active WHERE chat_id = :user_id"),
-            {"is_active": is_active, "user_id": user_id}
-        )
-        
-        session.commit()
+        with session_scope() as session:
+            # Обновляем статус активности
+            result = session.execute(
+                text("UPDATE users SET is_active = :is_active WHERE chat_id = :user_id"),
+                {"is_active": is_active, "user_id": user_id}
+            )
         
         if result.rowcount > 0:
             logger.info(f"Статус пользователя {user_id} обновлен на: {is_active}")
@@ -239,46 +381,40 @@ def update_user_status(user_id: int, is_active: bool) -> bool:
     
     except Exception as e:
         logger.error(f"Ошибка при обновлении статуса пользователя {user_id}: {e}")
-        session.rollback()
         return False
-    
-    finally:
-        session.close()
 
 
-def save_feedback(user_id: int, message: str) -> bool:
+def save_feedback(user_id: int, message: str) -> Optional[bool]:
     """
-    Сохраняет обратную связь от пользователя в базе данных.
+    Сохраняет обратную связь от зарегистрированного пользователя в базе данных.
+    Проверка регистрации и вставка выполняются одним запросом.
     
     Args:
         user_id: ID пользователя в Telegram
         message: Текст обратной связи
         
     Returns:
-        bool: True, если обратная связь успешно сохранена, иначе False
+        Optional[bool]: True, если обратная связь сохранена, False, если пользователь
+        не зарегистрирован, None при ошибке базы данных
     """
     try:
-        session = SessionLocal()
-        
-        # Создаем новую запись обратной связи
-        new_feedback = Feedback(
-            user_id=user_id,
-            message=message
-        )
+        with session_scope() as session:
+            result = session.execute(SAVE_FEEDBACK_STMT, {
+                "user_id": user_id,
+                "message": message,
+                "created_at": datetime.utcnow()
+            })
         
-        session.add(new_feedback)
-        session.commit()
+        if result.rowcount == 0:
+            logger.warning("Пользователь %s не зарегистрирован, обратная связь не сохранена", user_id)
+            return False
         
         logger.info(f"Сохранена обратная связь от пользователя {user_id}")
         return True
     
     except Exception as e:
         logger.error(f"Ошибка при сохранении обратной связи от пользователя {user_id}: {e}")
-        session.rollback()
-        return False
-    
-    finally:
-        session.close()
+        return None
 
 
 def get_active_users_by_day(day: int) -> list:
@@ -289,25 +425,16 @@ def get_active_users_by_day(day: int) -> list:
         day: День недели (0-6)
         
     Returns:
-        list: Список пользователей
+        list: Строки с полями chat_id и group_type
     """
     try:
-        session = SessionLocal()
-        
-        # Получаем пользователей для указанного дня недели
-        users = session.query(User).filter(
-            User.is_active == True,
-            User.group_day == day
-        ).all()
-        
-        return users
+        with session_scope() as session:
+            # Получаем пользователей для указанного дня недели
+            return session.execute(ACTIVE_USERS_BY_DAY_STMT, {"day": day}).all()
     
     except Exception as e:
         logger.error(f"Ошибка при получении списка пользователей для дня {day}: {e}")
         return []
-    
-    finally:
-        session.close()
 
 
 def check_database_connection() -> bool:
@@ -318,19 +445,17 @@ def check_database_connection() -> bool:
         bool: True, если соединение установлено успешно, иначе False
     """
     try:
-        session = SessionLocal()
-        # Пытаемся выполнить простой запрос
-        result = session.execute(text("SELECT 1")).scalar()
+        with session_scope() as session:
+            # Пытаемся выполнить простой запрос
+            session.execute(text("SELECT 1")).scalar()
         logger.info("✅ Соединение с базой данных установлено успешно")
         return True
     
     except Exception as e:
-        logger.error(f"❌ Ошибка при проверке соединения с базой данных: {e}")
-        logger.error(f"Traceback (most recent call last):\n{traceback.format_exc()}")
+        # Полный traceback нужен только при отладке
+        logger.error("❌ Ошибка при проверке соединения с базой данных: %s", e,
+                     exc_info=logger.isEnabledFor(logging.DEBUG))
         return False
-    
-    finally:
-        session.close()
 
 # Если модуль запущен напрямую, инициализируем базу данных
 if __name__ == "__main__":
@@ -345,9 +470,8 @@ if __name__ == "__main__":
             tables = inspector.get_table_names()
             logger.info(f"Созданные таблицы: {', '.join(tables)}")
             
-            # Проверяем структуру таблиц
-            for table in tables:
-                columns = inspector.get_columns(table)
+            # Проверяем структуру таблиц (колонки всех таблиц одним запросом)
+            for (_, table), columns in inspector.get_multi_columns().items():
                 column_names = [column['name'] for column in columns]
                 logger.info(f"Структура таблицы '{table}': {', '.join(column_names)}")
         except Exception as e:
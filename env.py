@@ -0,0 +1,21 @@
+"""
+Загрузка переменных окружения.
+Файл .env читается один раз за процесс, сколько бы модулей его ни запрашивали.
+"""
+
+import os
+from functools import cache
+
+from dotenv import load_dotenv
+
+
+@cache
+def ensure_env() -> None:
+    """
+    Загружает переменные окружения из файла .env.
+    Повторные вызовы ничего не делают.
+    На Render переменные уже заданы платформой, и файл .env не ищется.
+    """
+    if os.getenv('RENDER'):
+        return
+    load_dotenv()
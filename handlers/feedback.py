@@ -3,16 +3,22 @@
 Отвечает за обработку сообщений с обратной связью и отправку запросов на обратную связь.
 """
 
+import asyncio
 import logging
-from telegram import Update
-from telegram.ext import ContextTypes, MessageHandler, filters
+from telegram import Bot, Update
+from telegram.error import RetryAfter
+from telegram.ext import ContextTypes, MessageHandler
 
-from database import check_user_exists, save_feedback
-from config import Config
+from database import run_db, save_feedback
+from config import get_config
+from handlers.start import TEXT_MESSAGE
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Сколько раз пытаться отправить запрос, если Telegram просит подождать (RetryAfter)
+SEND_ATTEMPTS = 3
+
 async def process_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Обрабатывает сообщения с обратной связью от пользователей.
@@ -21,73 +27,87 @@ async def process_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     user = update.effective_user
     message_text = update.message.text
     
-    logger.info(f"Получено сообщение от пользователя {user.id}: {message_text[:50]}...")
+    logger.info("Получено сообщение от пользователя %s: %.50s...", user.id, message_text)
+    
+    # Сохраняем обратную связь; регистрация проверяется тем же запросом
+    saved = await run_db(save_feedback, user.id, message_text)
     
-    # Проверяем, зарегистрирован ли пользователь
-    if not check_user_exists(user.id):
-        logger.warning(f"Пользователь {user.id} не зарегистрирован, но отправил сообщение")
+    if saved is False:
+        logger.warning("Пользователь %s не зарегистрирован, но отправил сообщение", user.id)
         await update.message.reply_text(
             "Похоже, вы еще не зарегистрированы. Пожалуйста, используйте команду /start для регистрации."
         )
         return
     
-    # Сохраняем обратную связь в базе данных
-    if save_feedback(user.id, message_text):
-        logger.info(f"Обратная связь от пользователя {user.id} сохранена успешно")
+    if saved:
+        logger.info("Обратная связь от пользователя %s сохранена успешно", user.id)
     else:
-        logger.error(f"Ошибка при сохранении обратной связи от пользователя {user.id}")
-    
-    # Пересылаем обратную связь администратору
-    if Config.ADMIN_CHAT_ID:
-        user_info = f"Пользователь: {user.first_name}"
-        if user.last_name:
-            user_info += f" {user.last_name}"
-        if user.username:
-            user_info += f" (@{user.username})"
-        
-        admin_message = f"📝 Получена обратная связь!\n\n{user_info}\nID: {user.id}\n\n{message_text}"
-        
-        try:
-            await context.bot.send_message(
-                chat_id=Config.ADMIN_CHAT_ID,
-                text=admin_message
-            )
-            logger.info(f"Обратная связь от пользователя {user.id} переслана администратору")
-        except Exception as e:
-            logger.error(f"Ошибка при пересылке обратной связи администратору: {e}")
-    else:
-        logger.warning("ID администратора не задан, обратная связь не была переслана")
+        logger.error("Ошибка при сохранении обратной связи от пользователя %s", user.id)
     
     # Благодарим пользователя за обратную связь
     await update.message.reply_text(
         "Спасибо за вашу обратную связь! Она поможет нам улучшить курс."
     )
+    
+    # Пересылаем обратную связь администратору
+    admin_chat_id = get_config().ADMIN_CHAT_ID
+    if not admin_chat_id:
+        logger.warning("ID администратора не задан, обратная связь не была переслана")
+        return
+    
+    user_info = f"Пользователь: {user.first_name}"
+    if user.last_name:
+        user_info += f" {user.last_name}"
+    if user.username:
+        user_info += f" (@{user.username})"
+    
+    admin_message = f"📝 Получена обратная связь!\n\n{user_info}\nID: {user.id}\n\n{message_text}"
+    
+    try:
+        await context.bot.send_message(
+            chat_id=admin_chat_id,
+            text=admin_message,
+            disable_notification=True
+        )
+        logger.info("Обратная связь от пользователя %s переслана администратору", user.id)
+    except Exception as e:
+        logger.error("Ошибка при пересылке обратной связи администратору: %s", e)
 
-async def send_feedback_request(context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> bool:
+async def send_feedback_request(bot: Bot, chat_id: int) -> bool:
     """
     Отправляет запрос на обратную связь пользователю.
     
     Args:
-        context: Контекст обработчика
+        bot: Экземпляр бота, через который отправляется сообщение
         chat_id: ID чата пользователя
         
     Returns:
         bool: True, если запрос успешно отправлен, иначе False
     """
-    try:
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=(
-                "Привет! Как прошло сегодняшнее занятие?\n\n"
-                "Пожалуйста, поделитесь своими впечатлениями, замечаниями или предложениями. "
-                "Ваша обратная связь очень важна для нас!"
+    for attempt in range(1, SEND_ATTEMPTS + 1):
+        try:
+            await bot.send_message(
+                chat_id=chat_id,
+                text=(
+                    "Привет! Как прошло сегодняшнее занятие?\n\n"
+                    "Пожалуйста, поделитесь своими впечатлениями, замечаниями или предложениями. "
+                    "Ваша обратная связь очень важна для нас!"
+                )
             )
-        )
-        logger.info(f"Запрос на обратную связь отправлен пользователю {chat_id}")
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка при отправке запроса на обратную связь пользователю {chat_id}: {e}")
-        return False
+            logger.info("Запрос на обратную связь отправлен пользователю %s", chat_id)
+            return True
+        except RetryAfter as e:
+            # Превышен лимит Telegram: ждем указанное время и повторяем отправку
+            logger.warning("Лимит Telegram при отправке пользователю %s, повтор через %s с (попытка %s/%s)",
+                           chat_id, e.retry_after, attempt, SEND_ATTEMPTS)
+            if attempt < SEND_ATTEMPTS:
+                await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            logger.error("Ошибка при отправке запроса на обратную связь пользователю %s: %s", chat_id, e)
+            return False
+    
+    logger.error("Запрос на обратную связь пользователю %s не отправлен: лимит Telegram", chat_id)
+    return False
 
 # Создаем обработчик текстовых сообщений
-feedback_handler = MessageHandler(filters.TEXT & ~filters.COMMAND, process_feedback) 
\ No newline at end of file
+feedback_handler = MessageHandler(TEXT_MESSAGE, process_feedback) 
\ No newline at end of file
@@ -5,6 +5,7 @@
 
 import logging
 from datetime import datetime
+from types import MappingProxyType
 from telegram import Update
 from telegram.ext import (
     ContextTypes, 
@@ -14,7 +15,7 @@ from telegram.ext import (
     filters
 )
 
-from database import check_user_exists, create_new_user
+from database import check_user_exists, create_new_user, run_db
 from utils.helpers import parse_date, get_date_string
 from config import Config
 
@@ -24,16 +25,26 @@ logger = logging.getLogger(__name__)
 # Состояния диалога
 CHOOSING_GROUP, ENTERING_START_DATE = range(2)
 
+# Фильтр текстовых сообщений без команд, общий для всех обработчиков
+TEXT_MESSAGE = filters.TEXT & ~filters.COMMAND
+
+# Клавиатура выбора группы и обратный поиск ключа группы по подписи кнопки
+GROUP_KEYBOARD = [[f"{description} ({group})"] for group, description in Config.GROUPS.items()]
+GROUP_BY_LABEL = {f"{description} ({group})": group for group, description in Config.GROUPS.items()}
+
+# День недели занятий для каждой группы (0 - пн, 5 - сб)
+GROUP_DAY = MappingProxyType({'weekday': 0, 'weekend': 5})
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """
     Обработчик команды /start.
     Приветствует пользователя и предлагает выбрать группу.
     """
     user = update.effective_user
-    logger.info(f"Пользователь {user.id} запустил команду /start")
+    logger.info("Пользователь %s запустил команду /start", user.id)
     
     # Проверяем, зарегистрирован ли пользователь
-    if check_user_exists(user.id):
+    if await run_db(check_user_exists, user.id):
         await update.message.reply_text(
             f"Привет, {user.first_name}! Вы уже зарегистрированы. "
             "Чтобы оставить обратную связь о занятии, просто напишите мне сообщение."
@@ -47,13 +58,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     )
     
     # Отправляем варианты групп
-    keyboard = []
-    for group, description in Config.GROUPS.items():
-        keyboard.append([f"{description} ({group})"])
-    
     await update.message.reply_text(
         "Выберите один из вариантов:",
-        reply_markup={"keyboard": keyboard, "one_time_keyboard": True}
+        reply_markup={"keyboard": GROUP_KEYBOARD, "one_time_keyboard": True}
     )
     
     return CHOOSING_GROUP
@@ -65,13 +72,8 @@ async def group_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     text = update.message.text
     user = update.effective_user
     
-    # Парсим выбранную группу
-    group_info = None
-    for group, description in Config.GROUPS.items():
-        if f"{description} ({group})" == text:
-            group_info = group
-            break
-    
+    group_info = GROUP_BY_LABEL.get(text)
+
     if not group_info:
         await update.message.reply_text(
             "Пожалуйста, выберите группу из предложенных вариантов."
@@ -81,9 +83,9 @@ async def group_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     # Сохраняем выбор группы в контексте пользователя
     context.user_data['group'] = group_info
     # Определяем день недели для группы
-    context.user_data['group_day'] = 0 if group_info == 'weekday' else 5  # 0 - пн, 5 - сб
+    context.user_data['group_day'] = GROUP_DAY.get(group_info, 0)
     
-    logger.info(f"Пользователь {user.id} выбрал группу: {group_info}")
+    logger.info("Пользователь %s выбрал группу: %s", user.id, group_info)
     
     # Запрашиваем дату начала занятий
     await update.message.reply_text(
@@ -100,12 +102,9 @@ async def start_date_entered(update: Update, context: ContextTypes.DEFAULT_TYPE)
     text = update.message.text
     user = update.effective_user
     
-    # Парсим дату
-    try:
-        start_date = parse_date(text)
-        if not start_date:
-            raise ValueError("Неверный формат даты")
-    except ValueError:
+    # Парсим дату (None при неверном формате)
+    start_date = parse_date(text.strip())
+    if not start_date:
         await update.message.reply_text(
             "Пожалуйста, введите дату в формате ДД.ММ.ГГГГ, например: 01.09.2023"
         )
@@ -115,15 +114,15 @@ async def start_date_entered(update: Update, context: ContextTypes.DEFAULT_TYPE)
     group = context.user_data.get('group')
     group_day = context.user_data.get('group_day')
     
-    # Преобразуем дату в строку для логирования
+    # Преобразуем дату в строку для ответа пользователю
     date_str = get_date_string(start_date)
     
-    # Логирование перед созданием пользователя
-    logger.info(f"Попытка создания пользователя: ID={user.id}, имя={user.first_name}, "
-                f"группа={group}, день={group_day}, дата={date_str}")
+    logger.debug("Попытка создания пользователя: ID=%s, имя=%s, группа=%s, день=%s, дата=%s",
+                 user.id, user.first_name, group, group_day, date_str)
     
     # Создаем пользователя в базе данных
-    success = create_new_user(
+    success = await run_db(
+        create_new_user,
         user_id=user.id,
         username=user.username,
         first_name=user.first_name,
@@ -134,7 +133,7 @@ async def start_date_entered(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
     
     if success:
-        logger.info(f"Пользователь {user.id} успешно зарегистрирован. Группа: {group}, дата начала: {date_str}")
+        logger.info("Пользователь %s успешно зарегистрирован. Группа: %s, дата начала: %s", user.id, group, date_str)
         await update.message.reply_text(
             f"Отлично! Вы успешно зарегистрированы в группе {Config.GROUPS[group]}.\n"
             f"Дата начала курса: {date_str}.\n\n"
@@ -142,7 +141,7 @@ async def start_date_entered(update: Update, context: ContextTypes.DEFAULT_TYPE)
             "Вы также можете в любой момент отправить мне сообщение с отзывом."
         )
     else:
-        logger.error(f"Ошибка при регистрации пользователя {user.id}")
+        logger.error("Ошибка при регистрации пользователя %s", user.id)
         await update.message.reply_text(
             "К сожалению, произошла ошибка при регистрации. "
             "Пожалуйста, попробуйте еще раз позже или обратитесь к администратору."
@@ -155,7 +154,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     Отменяет текущий диалог.
     """
     user = update.effective_user
-    logger.info(f"Пользователь {user.id} отменил регистрацию")
+    logger.info("Пользователь %s отменил регистрацию", user.id)
     
     await update.message.reply_text(
         "Регистрация отменена. Вы можете начать заново, отправив команду /start"
@@ -167,8 +166,8 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 start_command_handler = ConversationHandler(
     entry_points=[CommandHandler("start", start_command)],
     states={
-        CHOOSING_GROUP: [MessageHandler(filters.TEXT & ~filters.COMMAND, group_choice)],
-        ENTERING_START_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, start_date_entered)]
+        CHOOSING_GROUP: [MessageHandler(TEXT_MESSAGE, group_choice)],
+        ENTERING_START_DATE: [MessageHandler(TEXT_MESSAGE, start_date_entered)]
     },
     fallbacks=[CommandHandler("cancel", cancel)]
 ) 
\ No newline at end of file
@@ -1,72 +1,182 @@
 import os
+import json
 import logging
+import random
 import sys
-from dotenv import load_dotenv
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
-
-# Настройка логирования
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    stream=sys.stdout
-)
+import time
+import requests
+from env import ensure_env
+
+# orjson разбирает ответы API заметно быстрее стандартного json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 logger = logging.getLogger(__name__)
 
 # Загрузка переменных окружения
-load_dotenv()
+ensure_env()
 
-# Получение токена бота
+# Получение токена бота (наличие проверяется в main)
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-if not TELEGRAM_TOKEN:
-    logger.error("Токен Telegram не найден в переменных окружения!")
-    sys.exit(1)
 
-logger.info(f"Используется токен: {TELEGRAM_TOKEN[:5]}...{TELEGRAM_TOKEN[-5:]}")
+# Базовый URL Bot API для этого токена
+API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+
+# Параметры long polling: Telegram держит запрос до POLL_TIMEOUT секунд,
+# пока не появятся обновления, и отдает не больше POLL_LIMIT за раз
+POLL_TIMEOUT = 50
+POLL_LIMIT = 100
+
+# Пауза перед повторным запросом после ошибки сети или API
+# (при 429 Telegram сам указывает паузу в parameters.retry_after)
+RETRY_DELAY = 5
+
+# Файл с последним подтвержденным offset, чтобы после перезапуска не обрабатывать обновления повторно
+OFFSET_FILE = os.path.join('.state', 'telegram-offset.json')
+
+# Одна HTTP-сессия на весь цикл опроса
+http_session = requests.Session()
+
+def load_offset():
+    """
+    Читает сохраненный offset для getUpdates.
 
-async def start_handler(update, context):
+    Returns:
+        int: offset или None, если он еще не сохранялся
+    """
+    try:
+        with open(OFFSET_FILE, encoding='utf-8') as f:
+            return json.load(f)['offset']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_offset(offset):
+    """
+    Сохраняет offset для getUpdates.
+
+    Args:
+        offset: ID следующего ожидаемого обновления
+    """
+    os.makedirs(os.path.dirname(OFFSET_FILE), exist_ok=True)
+
+    # Пишем во временный файл и атомарно подменяем им основной,
+    # чтобы падение во время записи не оставило поврежденный файл
+    tmp_file = f"{OFFSET_FILE}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'offset': offset}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, OFFSET_FILE)
+
+def send_message(chat_id, text):
+    """Отправляет сообщение пользователю."""
+    response = http_session.post(f"{API_URL}/sendMessage", data={'chat_id': chat_id, 'text': text}, timeout=10)
+    response.raise_for_status()
+
+def start_handler(message):
     """Простой обработчик команды /start для тестирования."""
-    user = update.effective_user
-    logger.info(f"Пользователь {user.id} отправил команду /start")
-    
-    await update.message.reply_text(
-        f"Привет, {user.first_name}! Это тестовый режим бота в режиме опроса.\n"
+    user = message['from']
+    logger.info(f"Пользователь {user['id']} отправил команду /start")
+
+    send_message(
+        message['chat']['id'],
+        f"Привет, {user.get('first_name', '')}! Это тестовый режим бота в режиме опроса.\n"
         "Бот получил вашу команду /start и отвечает на нее.\n\n"
         "Если вы видите это сообщение, значит бот настроен правильно и может отправлять сообщения.\n"
         "Теперь вы можете настроить вебхук для основного режима работы."
     )
 
-async def echo(update, context):
+def echo(message):
     """Эхо-обработчик для тестирования получения и отправки сообщений."""
-    logger.info(f"Получено сообщение: {update.message.text}")
-    
-    await update.message.reply_text(
-        f"Я получил ваше сообщение: {update.message.text}\n\n"
+    logger.info(f"Получено сообщение: {message['text']}")
+
+    send_message(
+        message['chat']['id'],
+        f"Я получил ваше сообщение: {message['text']}\n\n"
         "Если вы видите этот ответ, значит бот работает корректно в режиме опроса."
     )
 
+def handle_update(update):
+    """Передает текстовое сообщение из обновления подходящему обработчику."""
+    message = update.get('message')
+    if not message or 'text' not in message:
+        return
+
+    text = message['text']
+    if not text.startswith('/'):
+        echo(message)
+    elif text.split(maxsplit=1)[0].split('@')[0] == '/start':
+        start_handler(message)
+
 def main():
     """Запуск бота в режиме опроса (polling)."""
+    if not TELEGRAM_TOKEN:
+        print("Ошибка: TELEGRAM_TOKEN не найден в переменных окружения", file=sys.stderr)
+        sys.exit(1)
+
+    # Логирование настраивается только после проверки окружения
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO,
+        stream=sys.stdout
+    )
+
+    logger.info(f"Используется токен: {TELEGRAM_TOKEN[:5]}...{TELEGRAM_TOKEN[-5:]}")
     logger.info("Запуск бота в режиме опроса (polling) для тестирования")
-    
+
     try:
-        # Создание приложения бота
-        application = Application.builder().token(TELEGRAM_TOKEN).build()
-        logger.info("Приложение бота создано")
-        
-        # Добавление обработчиков
-        application.add_handler(CommandHandler("start", start_handler))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
-        logger.info("Обработчики добавлены")
-        
-        # Запуск бота в режиме опроса
-        logger.info("Запуск в режиме опроса (polling)")
-        application.run_polling()
-        
+        # getUpdates не работает, пока установлен вебхук
+        response = http_session.post(f"{API_URL}/deleteWebhook", timeout=10)
+        response.raise_for_status()
+        logger.info("Вебхук отключен на время опроса")
+
+        offset = load_offset()
+        logger.info("Запуск в режиме опроса (polling), offset: %s", offset)
+
+        while True:
+            params = {
+                'timeout': POLL_TIMEOUT,
+                'limit': POLL_LIMIT,
+                'allowed_updates': json.dumps(['message'])
+            }
+            if offset is not None:
+                params['offset'] = offset
+
+            try:
+                response = http_session.get(f"{API_URL}/getUpdates", params=params, timeout=POLL_TIMEOUT + 10)
+                if response.status_code == 429:
+                    # Flood control: ждем столько, сколько просит Telegram, со случайной добавкой,
+                    # иначе повторные запросы продлевают ограничение
+                    payload = json_loads(response.content)
+                    delay = payload.get('parameters', {}).get('retry_after', RETRY_DELAY) + random.random() * 0.5
+                    logger.warning("Превышен лимит запросов Telegram, повтор через %.1f с", delay)
+                    time.sleep(delay)
+                    continue
+                response.raise_for_status()
+                updates = json_loads(response.content).get('result', [])
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error("Ошибка при получении обновлений: %s", e)
+                time.sleep(RETRY_DELAY)
+                continue
+
+            for update in updates:
+                try:
+                    handle_update(update)
+                except Exception as e:
+                    logger.exception("Ошибка при обработке обновления %s: %s", update.get('update_id'), e)
+                offset = update['update_id'] + 1
+
+            # Сохраняем offset один раз на пачку обновлений
+            if updates:
+                save_offset(offset)
+
+    except KeyboardInterrupt:
+        logger.info("Опрос остановлен")
     except Exception as e:
-        logger.error(f"Произошла ошибка при запуске бота: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("Произошла ошибка при запуске бота: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
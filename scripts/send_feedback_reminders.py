@@ -6,39 +6,75 @@
 import os
 import sys
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 import asyncio
-from dotenv import load_dotenv
-from telegram.ext import ApplicationBuilder
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+# uvloop ускоряет цикл событий при множестве параллельных запросов (есть только для Linux/macOS)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Добавляем путь к корню проекта для корректного импорта
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from env import ensure_env
 from database import get_active_users_by_day
 from handlers import send_feedback_request
-from config import Config
+from config import get_config
 from utils.helpers import get_current_weekday
 
-# Настройка логирования
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
+logger = logging.getLogger(__name__)
+
+# Максимум одновременных отправок (запросов в полете)
+SEND_CONCURRENCY = 25
+
+# Максимум отправок в секунду (Telegram допускает около 30 сообщений в секунду)
+SEND_RATE = 25
+
+def setup_logging() -> QueueListener:
+    """
+    Настраивает логирование скрипта: логгеры только кладут записи в очередь, а вывод
+    в консоль и запись в файл выполняет поток QueueListener вне цикла событий.
+    
+    Returns:
+        QueueListener: Слушатель очереди (еще не запущенный)
+    """
+    os.makedirs('logs', exist_ok=True)
+    
+    log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    log_handlers = [
         logging.StreamHandler(sys.stdout),
-        logging.FileHandler("logs/reminders.log", encoding='utf-8')
+        # Файл открывается при первой записи
+        logging.FileHandler("logs/reminders.log", encoding='utf-8', delay=True)
     ]
-)
-logger = logging.getLogger(__name__)
+    for log_handler in log_handlers:
+        log_handler.setFormatter(log_formatter)
+    
+    log_queue = queue.SimpleQueue()
+    
+    # Заменяем вывод в консоль, который database настроил при импорте
+    root_logger = logging.getLogger()
+    root_logger.handlers.clear()
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(logging.INFO)
+    
+    return QueueListener(log_queue, *log_handlers)
 
 async def send_reminders():
     """
     Отправляет запросы на обратную связь активным пользователям для текущего дня недели.
     """
     # Загружаем переменные окружения
-    load_dotenv()
+    ensure_env()
     
     # Проверяем наличие токена
-    if not Config.TELEGRAM_TOKEN:
+    telegram_token = get_config().TELEGRAM_TOKEN
+    if not telegram_token:
         logger.error("Не указан токен Telegram в переменных окружения")
         return False
     
@@ -55,16 +91,38 @@ async def send_reminders():
     
     logger.info(f"Найдено {len(users)} активных пользователей для дня недели {current_day}")
     
-    # Создаем экземпляр бота
-    application = ApplicationBuilder().token(Config.TELEGRAM_TOKEN).build()
+    # Для рассылки достаточно клиента Bot API без Application (диспетчера, очереди задач);
+    # пул соединений рассчитан на одновременные отправки
+    bot = Bot(telegram_token, request=HTTPXRequest(connection_pool_size=SEND_CONCURRENCY))
+    
+    # Отправляем запросы на обратную связь параллельно: семафор ограничивает число
+    # запросов в полете, а отправки разносятся по времени не чаще SEND_RATE в секунду.
+    # Если лимит все же превышен, send_feedback_request повторяет отправку после RetryAfter
+    semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    next_send_at = loop.time()
+    
+    async def send_limited(chat_id: int) -> bool:
+        nonlocal next_send_at
+        # Каждая отправка занимает следующий свободный интервал 1/SEND_RATE секунды
+        send_at = max(next_send_at, loop.time())
+        next_send_at = send_at + 1 / SEND_RATE
+        await asyncio.sleep(send_at - loop.time())
+        async with semaphore:
+            return await send_feedback_request(bot, chat_id)
+    
+    async with bot:
+        results = await asyncio.gather(
+            *(send_limited(user.chat_id) for user in users),
+            return_exceptions=True
+        )
     
-    # Отправляем запросы на обратную связь
     success_count = 0
     failure_count = 0
-    
-    for user in users:
-        # Отправляем запрос пользователю
-        if await send_feedback_request(application, user.user_id):
+    for user, result in zip(users, results):
+        if isinstance(result, Exception):
+            logger.error("Ошибка при отправке запроса пользователю %s: %s", user.chat_id, result)
+        if result is True:
             success_count += 1
         else:
             failure_count += 1
@@ -74,5 +132,21 @@ async def send_reminders():
     return True
 
 if __name__ == "__main__":
-    logger.info("Запуск скрипта отправки запросов на обратную связь")
-    asyncio.run(send_reminders()) 
\ No newline at end of file
+    # Без токена скрипт завершается до настройки логирования и открытия файла журнала
+    ensure_env()
+    if not get_config().TELEGRAM_TOKEN:
+        print("Ошибка: не указан токен Telegram в переменных окружения", file=sys.stderr)
+        sys.exit(1)
+    
+    if uvloop is not None:
+        uvloop.install()
+    
+    log_listener = setup_logging()
+    log_listener.start()
+    try:
+        logger.info("Запуск скрипта отправки запросов на обратную связь")
+        asyncio.run(send_reminders())
+    finally:
+        # Дописываем оставшиеся в очереди записи перед выходом
+        log_listener.stop()
+ 
\ No newline at end of file
@@ -1,11 +1,22 @@
+import argparse
+import json
 import os
 import sys
 import requests
 import time
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+from env import ensure_env
+
+# orjson разбирает ответы API заметно быстрее стандартного json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # Загрузка переменных окружения
-load_dotenv()
+ensure_env()
 
 # Получение токена бота
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
@@ -13,15 +24,33 @@ if not TELEGRAM_TOKEN:
     print("Ошибка: TELEGRAM_TOKEN не найден в переменных окружения")
     sys.exit(1)
 
+# Базовый URL Bot API для этого токена
+API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+
+# Одна сессия на весь скрипт: соединение с api.telegram.org переиспользуется между вызовами.
+# Запросы к Bot API повторяются при временных ошибках (GET - по умолчанию, POST здесь идемпотентны),
+# проверка сервиса повторяется вручную в check_service_availability
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+http_session.mount("https://api.telegram.org/", HTTPAdapter(
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None
+    )
+))
+
 def check_current_webhook():
     """Проверяет текущий статус вебхука."""
-    webhook_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getWebhookInfo"
+    webhook_url = f"{API_URL}/getWebhookInfo"
     
     try:
-        response = requests.get(webhook_url)
+        response = http_session.get(webhook_url)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get("ok"):
             webhook_info = data.get("result", {})
@@ -37,27 +66,25 @@ def check_current_webhook():
         print(f"Ошибка при проверке вебхука: {e}")
         return None
 
-def delete_webhook():
-    """Удаляет текущий вебхук."""
-    delete_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/deleteWebhook"
+def confirm(prompt, force):
+    """
+    Запрашивает подтверждение у пользователя.
     
-    try:
-        response = requests.post(delete_url)
-        response.raise_for_status()
+    Args:
+        prompt: Текст вопроса
+        force: Подтверждать без вопроса (флаг --force)
         
-        data = response.json()
-        
-        if data.get("ok"):
-            print("Текущий вебхук успешно удален")
-            return True
-        else:
-            print(f"Ошибка при удалении вебхука: {data.get('description', 'Неизвестная ошибка')}")
-            return False
-    except Exception as e:
-        print(f"Ошибка при удалении вебхука: {e}")
+    Returns:
+        bool: True, если действие подтверждено. Без терминала и без --force - False
+    """
+    if force:
+        return True
+    if not sys.stdin.isatty():
+        print(f"{prompt} -> нет (неинтерактивный запуск, используйте --force)")
         return False
+    return input(f"{prompt} (y/n): ").lower() == 'y'
 
-def check_service_availability(url):
+def check_service_availability(url, force=False):
     """Проверяет доступность сервиса на Render перед установкой вебхука."""
     # Формируем URL для проверки доступности
     ping_url = f"{url.rstrip('/')}/ping"
@@ -68,7 +95,7 @@ def check_service_availability(url):
         # Если URL содержит токен, возможно, это полный URL для вебхука
         # Создаем отдельный URL для команды /ping для бота
         base_url = url.split(f"/bot{TELEGRAM_TOKEN}")[0]
-        bot_ping_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage?chat_id=YOUR_CHAT_ID&text=/ping"
+        bot_ping_url = f"{API_URL}/sendMessage?chat_id=YOUR_CHAT_ID&text=/ping"
     
     print(f"Проверка доступности сервиса на {ping_url}...")
     print("Это может занять некоторое время, если сервис на Render находится в спящем режиме.")
@@ -77,7 +104,7 @@ def check_service_availability(url):
     for attempt in range(1, max_attempts + 1):
         try:
             print(f"Попытка {attempt}/{max_attempts}...")
-            response = requests.get(ping_url, timeout=30)
+            response = http_session.get(ping_url, timeout=30)
             
             if response.status_code == 200:
                 print("Сервис доступен и отвечает корректно!")
@@ -107,29 +134,64 @@ def check_service_availability(url):
     
     print("\nУстановка вебхука может не сработать, если сервис недоступен.")
     
-    proceed = input("Продолжить установку вебхука, несмотря на недоступность сервиса? (y/n): ")
-    return proceed.lower() == 'y'
+    return confirm("Продолжить установку вебхука, несмотря на недоступность сервиса?", force)
 
-def set_webhook(webhook_url):
-    """Устанавливает вебхук для бота."""
-    set_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/setWebhook"
+def wait_for_webhook(expected_url, deadline=2.0):
+    """
+    Ждет, пока getWebhookInfo вернет установленный URL, опрашивая с растущей паузой.
     
-    # Формируем полный URL для вебхука
-    full_webhook_url = f"{webhook_url.rstrip('/')}/bot{TELEGRAM_TOKEN}"
+    Args:
+        expected_url: Ожидаемый URL вебхука
+        deadline: Максимальное время ожидания в секундах
+        
+    Returns:
+        dict: Последняя полученная информация о вебхуке или None
+    """
+    start = time.monotonic()
+    delay = 0.1
+    webhook_info = None
+    
+    while True:
+        try:
+            response = http_session.get(f"{API_URL}/getWebhookInfo", timeout=10)
+            webhook_info = json_loads(response.content).get("result", {})
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Ошибка при проверке вебхука: {e}")
+        
+        if webhook_info and webhook_info.get('url') == expected_url:
+            return webhook_info
+        if time.monotonic() - start + delay > deadline:
+            return webhook_info
+        
+        time.sleep(delay)
+        delay = min(delay * 2, 0.8)
+
+def build_webhook_url(base_url):
+    """Формирует полный URL вебхука из базового URL сервиса."""
+    return f"{base_url.rstrip('/')}/bot{TELEGRAM_TOKEN}"
+
+def set_webhook(full_webhook_url):
+    """Устанавливает вебхук для бота на уже сформированный полный URL."""
+    set_url = f"{API_URL}/setWebhook"
     
+    # Параметры совпадают с теми, что задает bot.py при запуске в режиме webhook
     params = {
         "url": full_webhook_url,
         "drop_pending_updates": True,  # Удаляем накопившиеся обновления
-        "max_connections": 40  # Максимальное количество соединений
+        "max_connections": Config.WEBHOOK_MAX_CONNECTIONS,
+        "allowed_updates": json.dumps(Config.ALLOWED_UPDATES)
     }
+    # Без секрета бот отклоняет запросы вебхука (403)
+    if os.getenv('WEBHOOK_SECRET'):
+        params["secret_token"] = os.getenv('WEBHOOK_SECRET')
     
     print(f"\nУстанавливаем вебхук на URL: {full_webhook_url}")
     
     try:
-        response = requests.post(set_url, params=params)
+        response = http_session.post(set_url, params=params)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get("ok"):
             print("\n✅ Вебхук успешно установлен!")
@@ -142,41 +204,73 @@ def set_webhook(webhook_url):
         print(f"\n❌ Ошибка при отправке запроса: {e}")
         return False
 
+def parse_args():
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Установка вебхука Telegram для бота")
+    parser.add_argument(
+        "--url",
+        default=os.getenv('RENDER_EXTERNAL_URL'),
+        help="Базовый URL сервиса (по умолчанию RENDER_EXTERNAL_URL)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Не задавать вопросов: заменить текущий вебхук и продолжить при недоступности сервиса"
+    )
+    parser.add_argument(
+        "--no-ping",
+        action="store_true",
+        help="Не проверять доступность сервиса перед установкой"
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     print("==== Инструмент установки вебхука Telegram ====\n")
     
+    # URL для нового вебхука: из аргументов или окружения, в терминале - запросом
+    webhook_url = args.url
+    if not webhook_url and sys.stdin.isatty():
+        webhook_url = input("\nВведите базовый URL вашего сервиса на Render (например, https://feedback-bot.onrender.com): ")
+    
+    if not webhook_url:
+        print("Ошибка: URL не может быть пустым (укажите --url или RENDER_EXTERNAL_URL)")
+        sys.exit(1)
+    
+    # Полный URL вебхука формируется один раз
+    full_webhook_url = build_webhook_url(webhook_url)
+    
     # Проверка текущего вебхука
     current_webhook = check_current_webhook()
+    current_url = current_webhook.get('url') if current_webhook else None
     
-    if current_webhook and current_webhook.get('url'):
-        print(f"\nОбнаружен уже установленный вебхук: {current_webhook.get('url')}")
-        choice = input("Хотите удалить текущий вебхук и установить новый? (y/n): ")
-        
-        if choice.lower() != 'y':
-            print("Операция отменена.")
-            sys.exit(0)
-        
-        # Удаление текущего вебхука
-        delete_webhook()
+    # Вебхук уже указывает куда нужно: повторная установка не требуется
+    if current_url == full_webhook_url and not args.force:
+        print("\nВебхук уже установлен на этот URL, изменения не требуются.")
+        sys.exit(0)
     
-    # Запрос URL для нового вебхука
-    webhook_url = input("\nВведите базовый URL вашего сервиса на Render (например, https://feedback-bot.onrender.com): ")
-    
-    if not webhook_url:
-        print("Ошибка: URL не может быть пустым")
-        sys.exit(1)
+    if current_url:
+        print(f"\nОбнаружен уже установленный вебхук: {current_url}")
+        # setWebhook заменяет текущий вебхук, отдельный deleteWebhook не нужен
+        if not confirm("Хотите заменить текущий вебхук новым?", args.force):
+            print("Операция отменена.")
+            sys.exit(0 if sys.stdin.isatty() else 1)
     
     # Проверяем доступность сервиса
-    if not check_service_availability(webhook_url):
+    if not args.no_ping and not check_service_availability(webhook_url, args.force):
         print("Операция отменена.")
         sys.exit(1)
     
     # Устанавливаем вебхук
-    if set_webhook(webhook_url):
+    if set_webhook(full_webhook_url):
         # Проверяем установленный вебхук
         print("\nПроверка установленного вебхука...")
-        time.sleep(2)  # Даем время на обработку запроса
-        check_current_webhook()
+        webhook_info = wait_for_webhook(full_webhook_url)
+        if webhook_info and webhook_info.get('url') == full_webhook_url:
+            print(f"URL: {webhook_info['url']}")
+        else:
+            print("⚠️ Установленный URL вебхука отличается от запрошенного")
         
         print("\n==== Установка вебхука завершена ====")
         print("Теперь ваш бот должен получать обновления через вебхук.")
@@ -187,6 +281,7 @@ def main():
         print("1. Убедитесь, что URL сервиса правильный и он доступен")
         print("2. Проверьте логи на Render на наличие ошибок")
         print("3. Попробуйте запустить бота в режиме опроса для отладки")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
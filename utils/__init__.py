@@ -3,6 +3,18 @@
 Экспортирует вспомогательные функции.
 """
 
-from utils.helpers import parse_date, get_date_string, get_current_weekday
+from utils.helpers import (
+    parse_date,
+    format_date,
+    get_date_string,
+    get_current_moscow_time,
+    get_current_weekday
+)
 
-__all__ = ['parse_date', 'get_date_string', 'get_current_weekday'] 
\ No newline at end of file
+__all__ = [
+    'parse_date',
+    'format_date',
+    'get_date_string',
+    'get_current_moscow_time',
+    'get_current_weekday'
+] 
\ No newline at end of file
@@ -4,12 +4,19 @@
 import logging
 import re
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 
 import config
 
 logger = logging.getLogger(__name__)
 
+# Московский часовой пояс
+MOSCOW_TZ = ZoneInfo('Europe/Moscow')
+
+# Поддерживаемые форматы дат: ДД.ММ.ГГГГ и ГГГГ-ММ-ДД
+DATE_DMY_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+DATE_YMD_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
 
 def get_current_moscow_time() -> datetime:
     """
@@ -18,18 +25,7 @@ def get_current_moscow_time() -> datetime:
     Returns:
         datetime: Текущее время в Москве
     """
-    return datetime.now(pytz.timezone('Europe/Moscow'))
-
-
-def get_weekday() -> int:
-    """
-    Возвращает текущий день недели (0 - понедельник, 6 - воскресенье).
-    
-    Returns:
-        int: Номер дня недели
-    """
-    # Получаем день недели (где понедельник - 0, воскресенье - 6)
-    return get_current_moscow_time().weekday()
+    return datetime.now(MOSCOW_TZ)
 
 
 def parse_date(date_string: str) -> datetime:
@@ -43,15 +39,18 @@ def parse_date(date_string: str) -> datetime:
         datetime: Дата в формате datetime или None, если строка имеет неверный формат
     """
     try:
-        # Пытаемся распарсить дату в формате ДД.ММ.ГГГГ
-        if re.match(r'^\d{2}\.\d{2}\.\d{4}$', date_string):
-            return datetime.strptime(date_string, '%d.%m.%Y')
-        # Пытаемся распарсить дату в формате ГГГГ-ММ-ДД
-        elif re.match(r'^\d{4}-\d{2}-\d{2}$', date_string):
-            return datetime.strptime(date_string, '%Y-%m-%d')
-        else:
-            logger.warning(f"Неверный формат даты: {date_string}")
-            return None
+        # ДД.ММ.ГГГГ: числа берутся из групп регулярного выражения, без разбора формата strptime
+        match = DATE_DMY_RE.fullmatch(date_string)
+        if match:
+            day, month, year = map(int, match.groups())
+            return datetime(year, month, day)
+        
+        # ГГГГ-ММ-ДД разбирает встроенный (на C) fromisoformat
+        if DATE_YMD_RE.fullmatch(date_string):
+            return datetime.fromisoformat(date_string)
+        
+        logger.warning(f"Неверный формат даты: {date_string}")
+        return None
     except ValueError as e:
         logger.warning(f"Ошибка при парсинге даты {date_string}: {e}")
         return None
@@ -89,12 +88,13 @@ def is_valid_date_format(date_str: str) -> bool:
         bool: True, если формат правильный, иначе False
     """
     # Проверка на соответствие формату DD.MM.YYYY
-    if not re.match(r'^\d{2}\.\d{2}\.\d{4}$', date_str):
+    match = DATE_DMY_RE.fullmatch(date_str)
+    if not match:
         return False
     
     try:
         # Проверка на корректность даты
-        day, month, year = map(int, date_str.split('.'))
+        day, month, year = map(int, match.groups())
         datetime(year=year, month=month, day=day)
         return True
     
@@ -119,9 +119,10 @@ def get_date_string(date: datetime) -> str:
 
 def get_current_weekday() -> int:
     """
-    Возвращает текущий день недели (0-6, где 0 - понедельник).
+    Возвращает текущий день недели по московскому времени (0-6, где 0 - понедельник).
+    Не зависит от часового пояса сервера (на Render это UTC).
     
     Returns:
         int: День недели (0-6)
     """
-    return datetime.now().weekday() 
\ No newline at end of file
+    return get_current_moscow_time().weekday()
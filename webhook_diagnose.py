@@ -5,11 +5,24 @@ import os
 import sys
 import json
 import time
+import socket
 import logging
 import requests
 import argparse
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
+from types import MappingProxyType
+from config import Config
+from env import ensure_env
+
+# orjson разбирает ответы API заметно быстрее стандартного json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # Настройка логирования
 logging.basicConfig(
@@ -19,7 +32,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Загрузка переменных окружения из .env
-load_dotenv()
+ensure_env()
 
 # Получение токена из окружения
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
@@ -27,95 +40,226 @@ if not TELEGRAM_TOKEN:
     logger.error("Ошибка: токен Telegram не найден в переменных окружения.")
     sys.exit(1)
 
+# Базовый URL Bot API для этого токена
+API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+
+# TCP keep-alive для соединений с Bot API: пока меню ждет ввода, ОС поддерживает
+# простаивающее соединение, и следующий запрос не тратит время на новое рукопожатие TLS
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+if hasattr(socket, "TCP_KEEPIDLE"):
+    KEEPALIVE_SOCKET_OPTIONS += [
+        (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10),
+    ]
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter, включающий TCP keep-alive на сокетах пула."""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = KEEPALIVE_SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+# Одна сессия на весь скрипт: соединения (TCP + TLS) переиспользуются между проверками.
+# GET-запросы к Bot API повторяются при временных ошибках; POST (sendMessage, setWebhook) - нет.
+# Проверки сервиса (в том числе просыпающегося Render) повторяются с паузами 0, 1, 2 с
+# (urllib3 делает первый повтор сразу, далее backoff_factor * 2^(n-1));
+# после последней попытки возвращается ответ с ошибкой, а не исключение
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False
+    )
+))
+http_session.mount("https://api.telegram.org/", KeepAliveAdapter(
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Таймауты (подключение, чтение) в секундах: медленное подключение обрывается быстро,
+# не расходуя время, отведенное на ответ
+API_TIMEOUT = (3.05, 10)
+# Сервис на Render после сна может отвечать до 30 секунд
+SERVICE_TIMEOUT = (5, 30)
+# getUpdates держит запрос до 30 секунд (long polling)
+POLLING_TIMEOUT = (3.05, 40)
+
+# Постоянные параметры setWebhook (список типов обновлений сериализуется один раз).
+# Совпадают с параметрами bot.py; без секрета бот отклоняет запросы вебхука (403)
+SET_WEBHOOK_PARAMS = MappingProxyType({
+    "drop_pending_updates": True,
+    "max_connections": Config.WEBHOOK_MAX_CONNECTIONS,
+    "allowed_updates": json.dumps(Config.ALLOWED_UPDATES),
+    **({"secret_token": os.getenv('WEBHOOK_SECRET')} if os.getenv('WEBHOOK_SECRET') else {})
+})
+
+# Постоянные параметры тестового сообщения
+TEST_MESSAGE_PARAMS = MappingProxyType({
+    "parse_mode": "HTML"
+})
+
+# Сколько байт тела ответа читать при проверке доступности сервиса
+BODY_PREVIEW_BYTES = 256
+
+# Подсказки по известным ошибкам Bot API (подстрока описания ошибки -> пояснение)
+API_ERROR_HINTS = MappingProxyType({
+    "chat not found": (
+        "⚠️ Причина: Бот не может отправить сообщение в указанный чат. Возможно, пользователь не инициировал чат с ботом.\n"
+        "🔍 Решение: Пользователь должен отправить сообщение боту или добавить бота в группу."
+    ),
+})
+
+# Время жизни кэша getWebhookInfo в секундах и сам кэш: (время получения, результат)
+WEBHOOK_INFO_TTL = 5
+webhook_info_cache = None
+
 # Получение URL веб-хука из окружения
 WEBHOOK_URL = os.getenv('WEBHOOK_URL')
 
+# Пинг-эндпоинт сервиса, если вебхук указывает на Render
+RENDER_PING_URL = (
+    f"{'/'.join(WEBHOOK_URL.split('/')[:3])}/ping"
+    if WEBHOOK_URL and "onrender.com" in WEBHOOK_URL else None
+)
+
 # Получение ID чата менеджера из окружения
 MANAGER_CHAT_ID = os.getenv('MANAGER_CHAT_ID')
 
-def check_telegram_api():
-    """Проверяет доступность API Telegram и информацию о боте."""
-    logger.info("Проверка доступности API Telegram...")
-    
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getMe"
-    
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
+def format_timestamp(timestamp):
+    """Форматирует UNIX timestamp из ответа API в локальное время без создания datetime."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+def tg_call(method, path, *, error, params=None, data=None, timeout=API_TIMEOUT, pending=None):
+    """Выполняет запрос к Bot API и разбирает ответ.
+    
+    Ответы 4xx не считаются ошибкой HTTP: Telegram возвращает в них JSON с описанием.
+    
+    Args:
+        method: HTTP-метод ("GET" или "POST")
+        path: Метод Bot API, например "/getMe"
+        error: Текст сообщения при ошибке API
+        params: Параметры строки запроса
+        data: Параметры тела запроса
+        timeout: Таймауты (подключение, чтение)
+        pending: Уже отправленный запрос (Future), если он есть
         
-        data = response.json()
+    Returns:
+        Поле result ответа или None при ошибке
+    """
+    try:
+        response = pending.result() if pending else http_session.request(
+            method, f"{API_URL}{path}", params=params, data=data, timeout=timeout)
+        if not 400 <= response.status_code < 500:
+            response.raise_for_status()
         
-        if data.get("ok"):
-            bot_info = data.get("result", {})
-            print(f"\n✅ API Telegram доступен")
-            print(f"👤 Имя бота: {bot_info.get('first_name')}")
-            print(f"👤 Имя пользователя: @{bot_info.get('username')}")
-            print(f"👤 ID бота: {bot_info.get('id')}")
-            print(f"👤 Поддержка Webhook: {bot_info.get('can_join_groups', 'Неизвестно')}")
-            return True
-        else:
-            print(f"\n❌ Ошибка при проверке API Telegram: {data.get('description', 'Неизвестная ошибка')}")
-            return False
-            
-    except requests.RequestException as e:
+        payload = json_loads(response.content)
+    except (requests.RequestException, ValueError) as e:
         print(f"\n❌ Ошибка при подключении к API Telegram: {e}")
         logger.error(f"Ошибка при подключении к API Telegram: {e}")
+        return None
+    
+    if payload.get("ok"):
+        return payload.get("result", {})
+    
+    description = payload.get("description", "Неизвестная ошибка")
+    print(f"\n❌ {error}: {description}")
+    for fragment, hint in API_ERROR_HINTS.items():
+        if fragment in description.lower():
+            print(hint)
+    return None
+
+def check_telegram_api(pending=None):
+    """Проверяет доступность API Telegram и информацию о боте.
+    
+    pending - уже отправленный запрос getMe (Future), если он есть.
+    """
+    logger.info("Проверка доступности API Telegram...")
+    
+    bot_info = tg_call("GET", "/getMe", error="Ошибка при проверке API Telegram", pending=pending)
+    if bot_info is None:
         return False
+    
+    print(f"\n✅ API Telegram доступен")
+    print(f"👤 Имя бота: {bot_info.get('first_name')}")
+    print(f"👤 Имя пользователя: @{bot_info.get('username')}")
+    print(f"👤 ID бота: {bot_info.get('id')}")
+    print(f"👤 Поддержка Webhook: {bot_info.get('can_join_groups', 'Неизвестно')}")
+    return True
 
-def get_webhook_info():
-    """Получает и отображает информацию о текущем вебхуке."""
+def fetch_webhook_info(pending=None):
+    """Запрашивает getWebhookInfo. Успешный ответ кэшируется на WEBHOOK_INFO_TTL секунд,
+    чтобы повторные проверки в одном запуске не ходили в API заново.
+    
+    pending - уже отправленный запрос getWebhookInfo (Future), если он есть.
+    
+    Returns:
+        dict: Информация о вебхуке или None при ошибке
+    """
+    global webhook_info_cache
+    
+    if pending is None and webhook_info_cache and time.monotonic() - webhook_info_cache[0] < WEBHOOK_INFO_TTL:
+        return webhook_info_cache[1]
+    
+    webhook_info = tg_call("GET", "/getWebhookInfo", error="Ошибка при получении информации о вебхуке", pending=pending)
+    if webhook_info is not None:
+        webhook_info_cache = (time.monotonic(), webhook_info)
+    return webhook_info
+
+def invalidate_webhook_info():
+    """Сбрасывает кэш getWebhookInfo после изменения вебхука."""
+    global webhook_info_cache
+    webhook_info_cache = None
+
+def get_webhook_info(pending=None):
+    """Получает и отображает информацию о текущем вебхуке.
+    
+    pending - уже отправленный запрос getWebhookInfo (Future), если он есть.
+    """
     print("\n📊 Проверка текущего статуса вебхука...")
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getWebhookInfo"
+    webhook_info = fetch_webhook_info(pending)
+    if webhook_info is not None:
+        print_webhook_info(webhook_info)
+    return webhook_info
+
+def print_webhook_info(webhook_info):
+    """Выводит информацию о вебхуке, полученную из getWebhookInfo."""
+    current_url = webhook_info.get('url', 'Не установлен')
     
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
+    print(f"\n=== СТАТУС ВЕБХУКА ===")
+    print(f"🔗 URL: {current_url}")
+    print(f"✅ Вебхук активен: {'Да' if current_url else 'Нет'}")
+    
+    if current_url and WEBHOOK_URL and current_url != WEBHOOK_URL:
+        print(f"⚠️ ВНИМАНИЕ: Текущий URL вебхука ({current_url}) не соответствует URL в .env файле ({WEBHOOK_URL})")
+    
+    if webhook_info.get('last_error_message'):
+        print(f"❌ Последняя ошибка: {webhook_info.get('last_error_message')}")
         
-        data = response.json()
+        # Конвертация UNIX timestamp в читаемую дату
+        last_error_date = webhook_info.get('last_error_date')
+        if last_error_date:
+            error_time = format_timestamp(last_error_date)
+            print(f"⏰ Время ошибки: {error_time}")
+    else:
+        print("✅ Ошибок вебхука не обнаружено")
         
-        if data.get("ok"):
-            webhook_info = data.get("result", {})
-            
-            current_url = webhook_info.get('url', 'Не установлен')
-            
-            print(f"\n=== СТАТУС ВЕБХУКА ===")
-            print(f"🔗 URL: {current_url}")
-            print(f"✅ Вебхук активен: {'Да' if current_url else 'Нет'}")
-            
-            if current_url and WEBHOOK_URL and current_url != WEBHOOK_URL:
-                print(f"⚠️ ВНИМАНИЕ: Текущий URL вебхука ({current_url}) не соответствует URL в .env файле ({WEBHOOK_URL})")
-            
-            if webhook_info.get('last_error_message'):
-                print(f"❌ Последняя ошибка: {webhook_info.get('last_error_message')}")
-                
-                # Конвертация UNIX timestamp в читаемую дату
-                last_error_date = webhook_info.get('last_error_date')
-                if last_error_date:
-                    error_time = datetime.fromtimestamp(last_error_date).strftime('%Y-%m-%d %H:%M:%S')
-                    print(f"⏰ Время ошибки: {error_time}")
-            else:
-                print("✅ Ошибок вебхука не обнаружено")
-                
-            print(f"📝 Ожидающие обновления: {webhook_info.get('pending_update_count', 0)}")
-            print(f"🔄 Максимальные соединения: {webhook_info.get('max_connections', 'Не указано')}")
-            
-            # Информация о разрешенных IP
-            allowed_updates = webhook_info.get('allowed_updates', [])
-            if allowed_updates:
-                print(f"📋 Разрешенные обновления: {', '.join(allowed_updates)}")
-            else:
-                print("📋 Разрешенные обновления: Все типы")
-                
-            return webhook_info
-        else:
-            print(f"\n❌ Ошибка при получении информации о вебхуке: {data.get('description', 'Неизвестная ошибка')}")
-            return None
-            
-    except requests.RequestException as e:
-        print(f"\n❌ Ошибка при подключении к API Telegram: {e}")
-        logger.error(f"Ошибка при подключении к API Telegram: {e}")
-        return None
+    print(f"📝 Ожидающие обновления: {webhook_info.get('pending_update_count', 0)}")
+    print(f"🔄 Максимальные соединения: {webhook_info.get('max_connections', 'Не указано')}")
+    
+    # Информация о разрешенных IP
+    allowed_updates = webhook_info.get('allowed_updates', [])
+    if allowed_updates:
+        print(f"📋 Разрешенные обновления: {', '.join(allowed_updates)}")
+    else:
+        print("📋 Разрешенные обновления: Все типы")
 
 def delete_webhook():
     """Удаляет текущий вебхук."""
@@ -126,25 +270,24 @@ def delete_webhook():
     
     print("\n🗑 Удаление вебхука...")
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/deleteWebhook?drop_pending_updates=true"
-    
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data.get("ok"):
-            print("✅ Вебхук успешно удален!")
-            return True
-        else:
-            print(f"❌ Ошибка при удалении вебхука: {data.get('description', 'Неизвестная ошибка')}")
-            return False
-            
-    except requests.RequestException as e:
-        print(f"❌ Ошибка при подключении к API Telegram: {e}")
-        logger.error(f"Ошибка при подключении к API Telegram: {e}")
+    if tg_call("GET", "/deleteWebhook", params={"drop_pending_updates": "true"},
+               error="Ошибка при удалении вебхука") is None:
         return False
+    
+    invalidate_webhook_info()
+    print("✅ Вебхук успешно удален!")
+    return True
+
+def read_body_preview(response):
+    """Читает из потокового ответа не больше BODY_PREVIEW_BYTES байт и выводит начало тела.
+    
+    Returns:
+        bytes: Прочитанное начало тела ответа
+    """
+    body = next(response.iter_content(BODY_PREVIEW_BYTES), b"")
+    text = body.decode(response.encoding or "utf-8", errors="replace")
+    print(f"📝 Содержимое ответа: {text[:100]}..." if len(text) > 100 else f"📝 Содержимое ответа: {text}")
+    return body
 
 def check_url_availability(url):
     """Проверяет доступность указанного URL."""
@@ -155,11 +298,11 @@ def check_url_availability(url):
     print(f"\n🔍 Проверка доступности URL: {url}")
     
     try:
-        # Используем увеличенный timeout для внешних сервисов, особенно для Render
-        response = requests.get(url, timeout=30)
-        
-        print(f"📊 Статус код: {response.status_code}")
-        print(f"📝 Содержимое ответа: {response.text[:100]}..." if len(response.text) > 100 else f"📝 Содержимое ответа: {response.text}")
+        # Используем увеличенный timeout для внешних сервисов, особенно для Render;
+        # тело ответа читается только в пределах BODY_PREVIEW_BYTES
+        with http_session.get(url, timeout=SERVICE_TIMEOUT, stream=True) as response:
+            print(f"📊 Статус код: {response.status_code}")
+            read_body_preview(response)
         
         if response.status_code < 400:
             print("✅ URL доступен!")
@@ -168,13 +311,16 @@ def check_url_availability(url):
             print(f"❌ URL недоступен (статус код: {response.status_code})")
             return False
             
-    except requests.RequestException as e:
+    except (requests.RequestException, ValueError) as e:
         print(f"❌ Ошибка при подключении к URL: {e}")
         logger.error(f"Ошибка при подключении к URL: {e}")
         return False
 
-def check_render_service():
-    """Проверяет доступность сервиса Render, если URL относится к Render."""
+def check_render_service(pending=None):
+    """Проверяет доступность сервиса Render, если URL относится к Render.
+    
+    pending - уже отправленный потоковый запрос к RENDER_PING_URL (Future), если он есть.
+    """
     if not WEBHOOK_URL:
         print("\n❌ URL вебхука не установлен в переменных окружения.")
         return False
@@ -184,48 +330,35 @@ def check_render_service():
         return True
     
     print(f"\n🔍 Проверка доступности сервиса Render...")
+    print(f"🔗 Проверка пинг-эндпоинта: {RENDER_PING_URL}")
     
-    # Извлекаем базовый URL сервиса на Render
-    base_url = '/'.join(WEBHOOK_URL.split('/')[:3])
-    ping_url = f"{base_url}/ping"
-    
-    print(f"🔗 Проверка пинг-эндпоинта: {ping_url}")
-    
-    for attempt in range(1, 4):
-        try:
-            print(f"Попытка {attempt}...")
-            response = requests.get(ping_url, timeout=30)
-            
+    try:
+        # Повторные попытки при 5xx и ошибках соединения выполняет адаптер сессии
+        response = pending.result() if pending else http_session.get(
+            RENDER_PING_URL, timeout=SERVICE_TIMEOUT, stream=True)
+        with response:
             print(f"📊 Статус код: {response.status_code}")
-            print(f"📝 Содержимое ответа: {response.text[:100]}..." if len(response.text) > 100 else f"📝 Содержимое ответа: {response.text}")
+            body = read_body_preview(response)
+        
+        if response.status_code < 400:
+            print("✅ Сервис Render доступен!")
             
-            if response.status_code < 400:
-                print("✅ Сервис Render доступен!")
-                
-                # Проверяем статус бота, если это наш собственный эндпоинт /ping
-                try:
-                    data = response.json()
-                    if "timestamp" in data and "status" in data:
-                        print(f"✅ Бот активен на Render! Статус: {data.get('status')}")
-                        print(f"⏰ Время последнего отклика: {data.get('timestamp')}")
-                except:
-                    # Если не можем распарсить JSON, просто продолжаем
-                    pass
-                
-                return True
-            else:
-                print(f"❌ Сервис Render недоступен (статус код: {response.status_code})")
-                
-                if attempt < 3:
-                    print("⏳ Ожидание 5 секунд перед повторной попыткой...")
-                    time.sleep(5)
-                
-        except requests.RequestException as e:
-            print(f"❌ Ошибка при подключении к сервису Render: {e}")
+            # Проверяем статус бота, если это наш собственный эндпоинт /ping
+            try:
+                data = json_loads(body)
+                if "timestamp" in data and "status" in data:
+                    print(f"✅ Бот активен на Render! Статус: {data.get('status')}")
+                    print(f"⏰ Время последнего отклика: {data.get('timestamp')}")
+            except:
+                # Если не можем распарсить JSON, просто продолжаем
+                pass
+            
+            return True
+        else:
+            print(f"❌ Сервис Render недоступен (статус код: {response.status_code})")
             
-            if attempt < 3:
-                print("⏳ Ожидание 5 секунд перед повторной попыткой...")
-                time.sleep(5)
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Ошибка при подключении к сервису Render: {e}")
     
     print("\n⚠️ Сервис Render может быть в спящем режиме. Это нормально для бесплатных планов.")
     print("⚠️ При первом запросе сервис может запускаться до 30 секунд.")
@@ -254,38 +387,19 @@ def set_webhook():
     print(f"\n🔄 Установка вебхука по URL: {webhook_url}")
     
     # Параметры для установки вебхука
-    params = {
-        "url": webhook_url,
-        "drop_pending_updates": True,
-        "max_connections": 100,
-        "allowed_updates": json.dumps(["message", "callback_query", "my_chat_member"])
-    }
+    params = {**SET_WEBHOOK_PARAMS, "url": webhook_url}
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/setWebhook"
-    
-    try:
-        response = requests.post(url, data=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data.get("ok"):
-            print(f"✅ Вебхук успешно установлен по URL: {webhook_url}")
-            print(f"📝 Ответ от API: {data.get('description', '')}")
-            
-            # Проверяем обновленную информацию о вебхуке
-            time.sleep(1)  # Небольшая задержка для применения изменений
-            get_webhook_info()
-            
-            return True
-        else:
-            print(f"❌ Ошибка при установке вебхука: {data.get('description', 'Неизвестная ошибка')}")
-            return False
-            
-    except requests.RequestException as e:
-        print(f"❌ Ошибка при подключении к API Telegram: {e}")
-        logger.error(f"Ошибка при подключении к API Telegram: {e}")
+    if tg_call("POST", "/setWebhook", data=params, error="Ошибка при установке вебхука") is None:
         return False
+    
+    invalidate_webhook_info()
+    print(f"✅ Вебхук успешно установлен по URL: {webhook_url}")
+    
+    # Проверяем обновленную информацию о вебхуке
+    time.sleep(1)  # Небольшая задержка для применения изменений
+    get_webhook_info()
+    
+    return True
 
 def send_test_message():
     """Отправляет тестовое сообщение, чтобы проверить работу бота."""
@@ -300,41 +414,20 @@ def send_test_message():
     
     message_text = f"🤖 Тестовое сообщение от бота!\n⏰ Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    params = {
-        "chat_id": chat_id,
-        "text": message_text,
-        "parse_mode": "HTML"
-    }
+    params = {**TEST_MESSAGE_PARAMS, "chat_id": chat_id, "text": message_text}
     
-    try:
-        response = requests.post(url, data=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data.get("ok"):
-            print("✅ Тестовое сообщение успешно отправлено!")
-            return True
-        else:
-            print(f"❌ Ошибка при отправке сообщения: {data.get('description', 'Неизвестная ошибка')}")
-            
-            # Подробная диагностика ошибки
-            if "chat not found" in data.get('description', '').lower():
-                print("⚠️ Причина: Бот не может отправить сообщение в указанный чат. Возможно, пользователь не инициировал чат с ботом.")
-                print("🔍 Решение: Пользователь должен отправить сообщение боту или добавить бота в группу.")
-            
-            return False
-            
-    except requests.RequestException as e:
-        print(f"❌ Ошибка при подключении к API Telegram: {e}")
-        logger.error(f"Ошибка при подключении к API Telegram: {e}")
+    # Подсказки по ошибкам (например, "chat not found") выводит tg_call
+    if tg_call("POST", "/sendMessage", data=params, error="Ошибка при отправке сообщения") is None:
         return False
+    
+    print("✅ Тестовое сообщение успешно отправлено!")
+    return True
 
 def check_updates():
     """Получает последние обновления для бота (только в режиме Long Polling)."""
-    # Проверяем статус вебхука - если активен, нельзя использовать getUpdates
-    webhook_info = get_webhook_info()
+    # Проверяем статус вебхука - если активен, нельзя использовать getUpdates.
+    # Нужен только URL, поэтому информация не выводится (и берется из кэша, если свежая)
+    webhook_info = fetch_webhook_info()
     
     if webhook_info and webhook_info.get('url'):
         print("\n⚠️ Вебхук активен! Невозможно получить обновления через getUpdates.")
@@ -351,65 +444,64 @@ def check_updates():
     
     print("\n📥 Получение последних обновлений для бота...")
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getUpdates?limit=10&timeout=30"
+    print("⏳ Ожидание обновлений (до 30 секунд)...")
+    updates = tg_call("GET", "/getUpdates", params={"limit": 10, "timeout": 30},
+                      timeout=POLLING_TIMEOUT, error="Ошибка при получении обновлений")
+    if updates is None:
+        return False
     
-    try:
-        print("⏳ Ожидание обновлений (до 30 секунд)...")
-        response = requests.get(url, timeout=60)  # Увеличенный timeout для long polling
-        response.raise_for_status()
+    if not updates:
+        print("📭 Обновлений не найдено. Отправьте боту сообщение и повторите проверку.")
+        return True
+    
+    print(f"\n📋 Получено обновлений: {len(updates)}")
+    
+    for i, update in enumerate(updates, 1):
+        print(f"\n--- Обновление {i} ---")
+        print(f"🆔 ID обновления: {update.get('update_id')}")
         
-        data = response.json()
+        if 'message' in update:
+            message = update['message']
+            print(f"💬 Тип: Сообщение")
+            print(f"👤 От пользователя: {message.get('from', {}).get('first_name')} (ID: {message.get('from', {}).get('id')})")
+            print(f"📝 Текст: {message.get('text', '[Нет текста]')}")
+            print(f"⏰ Время: {format_timestamp(message.get('date'))}")
         
-        if data.get("ok"):
-            updates = data.get("result", [])
-            
-            if not updates:
-                print("📭 Обновлений не найдено. Отправьте боту сообщение и повторите проверку.")
-                return True
-            
-            print(f"\n📋 Получено обновлений: {len(updates)}")
-            
-            for i, update in enumerate(updates, 1):
-                print(f"\n--- Обновление {i} ---")
-                print(f"🆔 ID обновления: {update.get('update_id')}")
-                
-                if 'message' in update:
-                    message = update['message']
-                    print(f"💬 Тип: Сообщение")
-                    print(f"👤 От пользователя: {message.get('from', {}).get('first_name')} (ID: {message.get('from', {}).get('id')})")
-                    print(f"📝 Текст: {message.get('text', '[Нет текста]')}")
-                    print(f"⏰ Время: {datetime.fromtimestamp(message.get('date')).strftime('%Y-%m-%d %H:%M:%S')}")
-                
-                elif 'callback_query' in update:
-                    callback = update['callback_query']
-                    print(f"💬 Тип: Callback Query")
-                    print(f"👤 От пользователя: {callback.get('from', {}).get('first_name')} (ID: {callback.get('from', {}).get('id')})")
-                    print(f"📝 Данные: {callback.get('data', '[Нет данных]')}")
-            
-            return True
-        else:
-            print(f"❌ Ошибка при получении обновлений: {data.get('description', 'Неизвестная ошибка')}")
-            return False
-            
-    except requests.RequestException as e:
-        print(f"❌ Ошибка при подключении к API Telegram: {e}")
-        logger.error(f"Ошибка при подключении к API Telegram: {e}")
-        return False
+        elif 'callback_query' in update:
+            callback = update['callback_query']
+            print(f"💬 Тип: Callback Query")
+            print(f"👤 От пользователя: {callback.get('from', {}).get('first_name')} (ID: {callback.get('from', {}).get('id')})")
+            print(f"📝 Данные: {callback.get('data', '[Нет данных]')}")
+    
+    return True
 
 def run_diagnostics():
     """Запускает полную диагностику бота и вебхука."""
     print("\n🔍 Запуск полной диагностики бота и вебхука...\n")
     
-    # 1. Проверка доступности API Telegram
-    if not check_telegram_api():
-        print("❌ Критическая ошибка: API Telegram недоступен. Дальнейшая диагностика невозможна.")
-        return
-    
-    # 2. Проверка статуса вебхука
-    webhook_info = get_webhook_info()
-    
-    # 3. Проверка доступности Render сервиса
-    check_render_service()
+    # Запросы getMe и getWebhookInfo независимы: отправляем их одновременно,
+    # а результаты выводим по порядку. Пинг Render (до 30 с на просыпание сервиса)
+    # отправляется только после успешной проверки API и идет параллельно с разбором
+    # информации о вебхуке. Зависимые шаги (тестовое сообщение, обновления)
+    # выполняются после, так как требуют подтверждения и информации о вебхуке
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        bot_info_request = executor.submit(http_session.get, f"{API_URL}/getMe", timeout=API_TIMEOUT)
+        webhook_request = executor.submit(http_session.get, f"{API_URL}/getWebhookInfo", timeout=API_TIMEOUT)
+        
+        # 1. Проверка доступности API Telegram
+        if not check_telegram_api(bot_info_request):
+            print("❌ Критическая ошибка: API Telegram недоступен. Дальнейшая диагностика невозможна.")
+            return
+        
+        render_request = executor.submit(
+            http_session.get, RENDER_PING_URL, timeout=SERVICE_TIMEOUT, stream=True
+        ) if RENDER_PING_URL else None
+        
+        # 2. Проверка статуса вебхука
+        webhook_info = get_webhook_info(webhook_request)
+        
+        # 3. Проверка доступности Render сервиса
+        check_render_service(render_request)
     
     # 4. Тестовое сообщение
     if MANAGER_CHAT_ID: